@@ -1,7 +1,6 @@
 import asyncio
 import json
 import os as _os
-import queue
 import random
 import re as _re
 import threading
@@ -26,12 +25,15 @@ from core.brain.limbic.reward import RewardSystem
 from core.brain.self.default_mode import DefaultModeNetwork
 from core.brain.self.user_model import UserModel
 from core.brain.cognition.task_queue import TaskQueue
-from core.brain.cognition.executive import Executive
+from core.brain.cognition.executive import Executive, linear_plan
 from core.senses.voice import Mouth
+from core.senses.speech import SpeechPipeline
 from core.senses.hearing import Ear
 from core.brain.sensorimotor.motor import MotorCortex
 from core.brain.interface.worker import WorkerNode
-from config import VOICE_BLEND, SANDBOX_PATH
+from core.brain.interface.vram_manager import vram
+from core.brain.cognition.store import store
+from config import VOICE_BLEND, SANDBOX_PATH, CONSOLIDATION_IDLE_SECONDS
 
 # ---------------------------------------------------------------------------
 # App & CORS
@@ -54,6 +56,7 @@ connected_clients: set[WebSocket] = set()
 atlas_busy        = threading.Event()        # set = busy, clear = idle
 last_intent       = "CHAT"
 _pool             = ThreadPoolExecutor(max_workers=3)
+_early_pool       = ThreadPoolExecutor(max_workers=2)   # speculative work on partial transcripts
 _ACKS             = [
     "Right away, Sir.", "At once, Sir.", "Processing.",
     "Initiating now, Sir.", "Consider it done, Sir.", "Executing, Sir."
@@ -127,6 +130,10 @@ _main_loop = None
 mouth = Mouth(device="cuda")
 ear   = Ear(device="cuda")
 
+# Pre-render reflex phrases so acks and habits never wait on Kokoro
+_STATIC_PHRASES = _ACKS + list(habits.habits.values()) + LLMEngine.fallback_phrases()
+threading.Thread(target=mouth.prewarm, args=(_STATIC_PHRASES,), daemon=True).start()
+
 # ---------------------------------------------------------------------------
 # WebSocket Broadcasting Helpers
 # ---------------------------------------------------------------------------
@@ -190,6 +197,8 @@ def run_cognition(user_input: str):
 
     atlas_busy.set()
     try:
+        early = _take_early_turn(user_input)
+
         # --- 1. Reflex / Habit Check ------------------------------------------
         habit_response = habits.check_trigger(user_input)
         stop_event = threading.Event()
@@ -197,16 +206,17 @@ def run_cognition(user_input: str):
 
         if habit_response:
             emit("atlas_speak", {"text": habit_response, "mode": "habit"})
-            mouth.speak(habit_response, blend_config=VOICE_BLEND, stop_event=stop_event)
+            mouth.speak(habit_response, blend_config=VOICE_BLEND, stop_event=stop_event, cache=True)
             ear.set_interrupt_target(None)
             return
 
         # --- 2. Parallel Routing / Salience / ToM -----------------------------
-        intent_f  = _pool.submit(router.route, user_input)
+        intent_f  = early or _pool.submit(router.classify, user_input)
         sal_f     = _pool.submit(salience.score_importance, user_input)
         tom_f     = _pool.submit(tom.analyze_state, user_input)
 
         intent     = intent_f.result()
+        bus.publish(f"intent_{intent}", user_input)
         score      = sal_f.result()
         user_state = tom_f.result()
 
@@ -234,7 +244,7 @@ def run_cognition(user_input: str):
         if intent == "COMMAND":
             ack = random.choice(_ACKS)
             emit("atlas_speak", {"text": ack, "mode": "ack"})
-            mouth.speak(ack, blend_config=VOICE_BLEND, stop_event=stop_event)
+            mouth.speak(ack, blend_config=VOICE_BLEND, stop_event=stop_event, cache=True)
 
             synthesized = brain.synthesize_task(user_input)
             emit("orchestrator", {"task": synthesized[:200]})
@@ -245,10 +255,9 @@ def run_cognition(user_input: str):
             if synthesized.startswith("[MULTI_STEP]"):
                 raw_steps = synthesized.replace("[MULTI_STEP]", "").strip()
                 steps = [s.strip() for s in raw_steps.split("|") if s.strip()]
-                if len(steps) < 2:
-                    steps = executive.plan_execution(user_input)
-                emit("executive_plan", {"steps": steps})
-                sys_result = worker.execute_plan(steps)
+                plan = linear_plan(steps) if len(steps) >= 2 else executive.plan_graph(user_input)
+                emit("executive_plan", {"steps": [n["step"] for n in plan], "after": [n["after"] for n in plan]})
+                sys_result = worker.execute_plan(plan)
             else:
                 sys_result = worker.execute_task(synthesized)
 
@@ -265,25 +274,12 @@ def run_cognition(user_input: str):
             )
 
         # --- 5. Streaming LLM Response ----------------------------------------
-        # Speech runs in a parallel thread fed by a queue so UI tokens are
-        # never blocked waiting for mouth.speak() to finish.
-        speech_queue = queue.Queue()
-
-        def speech_worker():
-            """Drains the speech queue, speaking each sentence in order."""
-            while True:
-                sentence = speech_queue.get()
-                if sentence is None:          # poison pill — we're done
-                    break
-                if not stop_event.is_set():
-                    mouth.speak(sentence, blend_config=VOICE_BLEND, stop_event=stop_event)
-                speech_queue.task_done()
-
-        speech_thread = threading.Thread(target=speech_worker, daemon=True)
-        speech_thread.start()
+        # Tokens go to the UI immediately; the speech pipeline segments them,
+        # synthesises sentence N+1 while sentence N plays, and never blocks
+        # the token loop.
+        speech = SpeechPipeline(mouth, stop_event=stop_event) if mouth else None
 
         response_gen     = brain.think(llm_input, intent=intent, user_state=user_state, task_queue=task_queue)
-        current_sentence = ""
         full_response    = ""
         interrupted      = False
 
@@ -295,26 +291,18 @@ def run_cognition(user_input: str):
 
             if "message" in chunk:
                 content = chunk["message"]["content"].replace("*", "").replace("#", "")
-                full_response    += content
-                current_sentence += content
+                full_response += content
 
                 # Emit token to UI immediately — never blocked by speech
                 emit("atlas_token", {"text": content})
 
-                # Queue each completed sentence for the speech thread
-                if mouth and any(p in content for p in [".", "!", "?", "\n"]):
-                    sentence = current_sentence.strip()
-                    if len(sentence) > 1:
-                        speech_queue.put(sentence)
-                    current_sentence = ""
+                if speech:
+                    speech.feed(content)
 
-        # Flush any partial sentence left at end of stream
-        if mouth and current_sentence.strip() and not interrupted:
-            speech_queue.put(current_sentence.strip())
-
-        # Signal the speech thread to stop after it finishes its queue
-        speech_queue.put(None)
-        speech_thread.join()
+        # Flush any partial sentence and wait for playback to drain
+        if speech:
+            speech.finish()
+            speech.log_metrics()
 
         # Broadcast the complete assembled response
         if full_response.strip():
@@ -362,15 +350,27 @@ def handle_task_due(task: dict):
     task_queue.complete(task["id"])
 
 
+def _idle_consolidate():
+    """Heartbeat hook: consolidate memory in a bounded slice once the user has been quiet a while."""
+    if atlas_busy.is_set() or time.time() - dmn.last_user_input_time < CONSOLIDATION_IDLE_SECONDS:
+        return
+    try:
+        sleep_sys.idle_consolidate()
+    except Exception as e:
+        print(f"[CONSOLIDATOR] Idle run failed to start: {e}")
+
+
 # --- Bus Subscriptions -------------------------------------------------------
 bus.subscribe("task_due",            handle_task_due)
 bus.subscribe("intent_COMMAND",      lambda x: emit("switch_app", {"app": "console"}))
 bus.subscribe("high_salience_event", lambda x: emit("high_salience", {"event": x}))
 bus.subscribe("user_state_updated",  lambda x: emit("user_state",    {"state": x}))
+bus.subscribe("learn_new_habit",     lambda x: threading.Thread(target=mouth.prewarm, args=([x.get("response", "")],), daemon=True).start())
 
 # --- Default Mode Network ----------------------------------------------------
 dmn = DefaultModeNetwork(bus, interoception=brain.interoception, brain=brain)
 dmn.start_wandering(callback=handle_proactive)
+bus.subscribe("heartbeat", lambda ts: _idle_consolidate())
 
 # ---------------------------------------------------------------------------
 # VAD Loop — runs in its own thread, feeds the shared cognition pipeline
@@ -378,6 +378,64 @@ dmn.start_wandering(callback=handle_proactive)
 
 _vad_thread_running = True
 
+# Speculative turn prepared from the stable prefix of a partial transcript
+_early_turn = {"utterance": None, "prefix": "", "intent": None}
+_early_lock = threading.Lock()
+
+
+def _norm_utterance(text: str) -> str:
+    return " ".join(_re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def _prepare_turn(partial: dict):
+    """Start routing and warm-ups on the committed prefix while the user is still talking."""
+    prefix = partial["stable"]
+    if partial["final"] or atlas_busy.is_set() or len(prefix.split()) < 3:
+        return
+    with _early_lock:
+        new_utterance = _early_turn["utterance"] != partial["utterance"]
+        if not new_utterance and _early_turn["prefix"] == prefix:
+            return
+        # Only the final text can reuse the intent, so an older prefix's is never needed
+        if _early_turn["intent"] is not None:
+            _early_turn["intent"].cancel()
+        _early_turn.update(
+            utterance=partial["utterance"],
+            prefix=prefix,
+            # Keyword rules only: never one LLM routing call per committed word
+            intent=_early_pool.submit(router.classify_rules, prefix),
+        )
+    if new_utterance:
+        _early_pool.submit(vram.ensure_loaded, "butler")
+    _early_pool.submit(brain.memory.embedder.encode, prefix)
+
+
+def _take_early_turn(user_input: str):
+    """
+    Return the speculative intent future if the keyword rules settled it on
+    exactly this text; otherwise the caller runs the full classify.
+    """
+    with _early_lock:
+        prefix, intent_f = _early_turn["prefix"], _early_turn["intent"]
+        _early_turn.update(utterance=None, prefix="", intent=None)
+    if intent_f is None:
+        return None
+    if (_norm_utterance(prefix) == _norm_utterance(user_input)
+            and intent_f.done() and not intent_f.cancelled() and intent_f.result()):
+        print("[VAD] Reusing intent routed on the stable prefix.")
+        return intent_f
+    intent_f.cancel()
+    return None
+
+
+def partial_listener_loop():
+    while _vad_thread_running:
+        partial = ear.partial_queue.get()
+        try:
+            _prepare_turn(partial)
+        except Exception as e:
+            print(f"[VAD] Early dispatch failed: {e}")
+
 def vad_listener_loop():
     """Continuously listens for voice input and routes it through cognition."""
     ear.start_listening()
@@ -396,6 +454,8 @@ def vad_listener_loop():
 
 
 threading.Thread(target=vad_listener_loop, daemon=True).start()
+if ear.streaming:
+    threading.Thread(target=partial_listener_loop, daemon=True).start()
 
 # ---------------------------------------------------------------------------
 # System Vitals Streamer
@@ -452,6 +512,7 @@ async def shutdown_event():
     )
     if stats.get("consolidation") and stats["consolidation"].get("consolidated", 0) > 0:
         print(f"[CONSOLIDATOR] Merged {stats['consolidation']['consolidated']} facts.")
+    store.close()
 
     try:
         mouth.close()
@@ -460,47 +521,31 @@ async def shutdown_event():
     print("[SYS] Server offline.")
 
 
-from core.brain.cognition.memory import MemorySystem
+def _tag_list(tags: str) -> list:
+    return [t.strip() for t in tags.split(",") if t.strip()]
+
 
 @app.get("/memory/list")
-async def memory_list():
-    mem = MemorySystem()
-    if mem.collection.count() == 0:
-        return {"memories": [], "total": 0}
-    results = mem.collection.get(include=["documents", "metadatas"])
-    memories = []
-    for doc_id, doc, meta in zip(results["ids"], results["documents"], results["metadatas"]):
-        memories.append({
-            "id":         doc_id,
-            "text":       doc,
-            "importance": meta.get("importance", 5.0),
-            "tags":       meta.get("tags", "").split(",") if meta.get("tags") else [],
-            "timestamp":  meta.get("timestamp", ""),
-        })
-    memories.sort(key=lambda x: x["importance"], reverse=True)
-    return {"memories": memories, "total": len(memories)}
+async def memory_list(
+    limit:  int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    sort:   str = "importance",             # importance | recent | oldest
+    tags:   str = "",
+):
+    return brain.memory.list_memories(limit=limit, offset=offset, sort=sort, tags=_tag_list(tags))
 
 
 @app.get("/memory/search")
-async def memory_search(q: str = ""):
-    mem = MemorySystem()
-    if not q.strip() or mem.collection.count() == 0:
-        return {"memories": [], "total": 0}
-    results = mem.recall(q, n_results=20, similarity_threshold=0.6)
-    all_data = mem.collection.get(include=["documents", "metadatas"])
-    text_to_meta = {doc: meta for doc, meta in zip(all_data["documents"], all_data["metadatas"])}
-    text_to_id   = {doc: doc_id for doc, doc_id in zip(all_data["documents"], all_data["ids"])}
-    memories = []
-    for text in results:
-        meta = text_to_meta.get(text, {})
-        memories.append({
-            "id":         text_to_id.get(text, ""),
-            "text":       text,
-            "importance": meta.get("importance", 5.0),
-            "tags":       meta.get("tags", "").split(",") if meta.get("tags") else [],
-            "timestamp":  meta.get("timestamp", ""),
-        })
-    return {"memories": memories, "total": len(memories)}
+async def memory_search(
+    q:      str = "",
+    limit:  int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    tags:   str = "",
+):
+    # No total: matches are only ranked up to a fixed pool, so an exact count is not known
+    if not q.strip():
+        return {"memories": [], "offset": offset, "next_offset": None}
+    return brain.memory.search_page(q, limit=limit, offset=offset, tags=_tag_list(tags))
 
 
 @app.get("/status")
@@ -509,6 +554,12 @@ async def get_status():
     return dict(_runtime_status)
 
 
+@app.get("/tools/stats")
+async def tool_stats():
+    """Per-tool call counts, error rates and latency histograms since startup."""
+    return {"tools": worker.tools.stats()}
+
+
 @app.get("/sandbox/files")
 async def sandbox_files():
     """Return a flat list of relative file paths inside the sandbox."""
@@ -542,9 +593,10 @@ async def sandbox_file(path: str = Query(...)):
 
 @app.delete("/memory/{memory_id}")
 async def memory_delete(memory_id: str):
-    mem = MemorySystem()
+    mem = brain.memory
     try:
-        mem.collection.delete(ids=[memory_id])
+        with store.write_lock:
+            mem.collection.delete(ids=[memory_id])
         return {"success": True, "deleted": memory_id}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -4,6 +4,10 @@ SANDBOX_PATH = "D:\\atlas_sandbox"
 DOCKER_IMAGE = "python:3.10-slim"
 CONTAINER_NAME = "atlas-worker-sandbox"
 MEMORY_DB_PATH = "./atlas_memory"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_CACHE_SIZE = 4096
+EMBEDDING_CACHE_PATH = "./atlas_embedding_cache.sqlite"   # None disables the on-disk tier
+EMBEDDING_CACHE_DISK_ENTRIES = 50000   # ~80 MB of MiniLM vectors; least recently used rows are pruned past this
 
 WORKER_MODEL = "qwen2.5-coder:3b"
 ARCHITECT_LOCAL_MODEL = "qwen2.5-coder:14b"
@@ -11,7 +15,15 @@ BUTLER_MODEL = "llama3.1:latest"
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
 
 WORKER_MAX_STEPS = 8
+WORKER_PLAN_PARALLELISM = 3    # plan steps in flight at once (model turns still run one at a time)
+WORKER_TOOL_PARALLELISM = 3    # concurrent I/O-bound tool calls: web_search, read_url, execute_bash, cloud
+WORKER_STREAMING = True        # stream worker turns and stop at the end of the first tool call
+WORKER_CONTEXT_RECENT_STEPS = 2        # newest worker steps kept verbatim; older ones are compacted to one line
+WORKER_CONTEXT_PAYLOAD_TOKENS = 300    # tool results above this are shown by reference once superseded
 BASH_TIMEOUT = 15
+# Per-tool call deadlines (seconds) enforced by ToolRegistry; tools not listed run unbounded.
+# execute_bash is killed in the sandbox after BASH_TIMEOUT; its entry is only a backstop.
+TOOL_TIMEOUTS = {"execute_bash": BASH_TIMEOUT + 5, "web_search": 20, "read_url": 15, "python_repl": 10, "ask_cloud_architect": 180}
 
 # Legacy constant kept for any code that still references it.
 # New code should use VRAMManager.get_keep_alive(role) instead.
@@ -25,7 +37,32 @@ SESSION_SUMMARIZE_EVERY_N_TURNS = 16
 SHORT_TERM_MEMORY_SIZE = 6
 CONVERSATION_WINDOW = 6
 
+# Per-source deadlines (seconds) for the parallel context-gathering stage in LLMEngine.think
+CONTEXT_SOURCE_TIMEOUTS = {"memory": 0.6, "episodes": 0.6, "vitals": 0.2, "profile": 0.2, "tasks": 0.2}
+
+# Prompt token budgets per model. Kept under Ollama's default 4096-token context so the
+# reply still fits; raising them only helps if num_ctx is raised server-side as well.
+PROMPT_TOKEN_BUDGETS = {BUTLER_MODEL: 3584, WORKER_MODEL: 2816}   # worker leaves room for num_predict=1200
+PROMPT_TOKEN_BUDGET_DEFAULT = 3072
+
 VOICE_BLEND = {'bm_george': 0.7, 'bm_fable': 0.3}
+VOICE_CACHE_PATH = "./atlas_voice_cache"   # None disables the phrase cache
+VOICE_CACHE_MAX_MB = 64
+
+# Recall ranking: similarity / importance / recency / access frequency
+MEMORY_SCORE_WEIGHTS = {"similarity": 0.6, "importance": 0.2, "recency": 0.15, "access": 0.05}
+MEMORY_RECENCY_HALF_LIFE_DAYS = 30
+MEMORY_ACCESS_FLUSH_SECONDS = 120
+
+CONSOLIDATION_STATE_PATH = "./atlas_consolidation.json"
+CONSOLIDATION_IDLE_SECONDS = 300       # quiet time before an idle consolidation slice
+CONSOLIDATION_SLICE_SECONDS = 30       # budget of one idle slice
+CONSOLIDATION_SHUTDOWN_SECONDS = 10    # budget at shutdown; the rest waits for the next session
+CONSOLIDATION_WORKERS = 2              # concurrent cluster summaries (match OLLAMA_NUM_PARALLEL)
+CONSOLIDATION_THRESHOLD = 0.3          # max cosine distance between ANY two facts merged into one summary
+
+EAR_STREAMING = True            # transcribe while the user is still talking
+EAR_PARTIAL_INTERVAL = 0.6      # seconds of new speech between partial passes
 
 ROUTER_COMMAND_ACTIONS = ["write", "make", "create", "build", "erase", "delete", "generate", "run", "execute", "compile", "install", "deploy", "open", "launch", "use"]
 ROUTER_COMMAND_TARGETS = ["project", "c++", "cpp", "script", "file", "directory", "python", "code", "architect", "worker", "program", "app", "website", "server", "react", "node", "game"]
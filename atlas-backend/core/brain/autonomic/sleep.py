@@ -4,7 +4,8 @@ from colorama import Fore
 from datetime import datetime
 from core.brain.limbic.archivist import Archivist
 from core.brain.limbic.consolidator import Consolidator
-from config import MEMORY_DB_PATH, BUTLER_MODEL, SESSION_SUMMARIZE_EVERY_N_TURNS
+from config import (MEMORY_DB_PATH, BUTLER_MODEL, SESSION_SUMMARIZE_EVERY_N_TURNS,
+                    CONSOLIDATION_SLICE_SECONDS, CONSOLIDATION_SHUTDOWN_SECONDS, CONSOLIDATION_THRESHOLD)
 
 class SleepSystem:
     def __init__(self, db_path=MEMORY_DB_PATH, model_name=BUTLER_MODEL):
@@ -12,6 +13,7 @@ class SleepSystem:
         self.consolidator = Consolidator(db_path=db_path, model_name=model_name)
         self._turn_counter = 0
         self._background_thread = None
+        self._consolidation_thread = None
 
     def tick(self, session_history: list):
         self._turn_counter += 1
@@ -33,11 +35,25 @@ class SleepSystem:
         except Exception as e:
             print(Fore.RED + f" [SLEEP] Mid-session summarization failed: {e}")
 
-    def sleep(self, conversation: list, session_start: datetime, consolidate: bool = True) -> dict:
+    def idle_consolidate(self, budget_seconds: float = CONSOLIDATION_SLICE_SECONDS):
+        """Run one bounded consolidation slice in the background (no-op if one is running)."""
+        if self._consolidation_thread is not None and self._consolidation_thread.is_alive():
+            return
+        self._consolidation_thread = threading.Thread(
+            target=self.consolidator.consolidate,
+            kwargs={"min_cluster_size": 2, "threshold": CONSOLIDATION_THRESHOLD, "budget_seconds": budget_seconds},
+            daemon=True
+        )
+        self._consolidation_thread.start()
+
+    def sleep(self, conversation: list, session_start: datetime, consolidate: bool = True,
+              budget_seconds: float = CONSOLIDATION_SHUTDOWN_SECONDS) -> dict:
         stats = {
             "session_archived": self.archivist.archive_session(conversation, session_start),
             "consolidation": None
         }
         if consolidate:
-            stats["consolidation"] = self.consolidator.consolidate(min_cluster_size=2, threshold=0.85)
+            stats["consolidation"] = self.consolidator.consolidate(
+                min_cluster_size=2, threshold=CONSOLIDATION_THRESHOLD, budget_seconds=budget_seconds
+            )
         return stats
\ No newline at end of file
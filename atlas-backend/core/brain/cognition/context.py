@@ -0,0 +1,63 @@
+"""
+Context Assembler — concurrent fan-out of the per-turn context lookups.
+
+Long-term memory, past episodes, vitals, the user profile and pending tasks
+are independent of each other, so they are gathered in parallel instead of
+one after another.  Each source gets its own deadline; a source that misses
+it is dropped from this turn's prompt rather than holding up generation.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from colorama import Fore
+from config import CONTEXT_SOURCE_TIMEOUTS
+
+_DEFAULT_TIMEOUT = 0.5
+
+
+class ContextAssembler:
+    def __init__(self, max_workers: int = 6, timeouts: dict = None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="context")
+        self.timeouts = dict(CONTEXT_SOURCE_TIMEOUTS if timeouts is None else timeouts)
+        self.last_report = {}
+
+    def gather(self, sources: dict) -> dict:
+        """
+        *sources* maps a name to a zero-argument callable.  Returns a dict of
+        name -> result; sources that time out or raise are returned as None.
+        Per-source status and latency are kept in ``last_report``.
+        """
+        start = time.perf_counter()
+        futures = {}
+        finished_at = {}
+        for name, fn in sources.items():
+            futures[name] = self._pool.submit(self._timed, fn, name, finished_at)
+
+        results, report = {}, {}
+        for name, future in futures.items():
+            deadline = start + self.timeouts.get(name, _DEFAULT_TIMEOUT)
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                report[name] = {"status": "ok", "ms": round((finished_at[name] - start) * 1000, 1)}
+            except FutureTimeout:
+                results[name] = None
+                report[name] = {"status": "timeout", "ms": round(self.timeouts.get(name, _DEFAULT_TIMEOUT) * 1000, 1)}
+                print(Fore.RED + f" [CONTEXT] '{name}' missed its deadline — dropped this turn.")
+            except Exception as e:
+                results[name] = None
+                report[name] = {"status": "error", "ms": round((finished_at.get(name, time.perf_counter()) - start) * 1000, 1), "error": str(e)}
+                print(Fore.RED + f" [CONTEXT] '{name}' failed: {e}")
+
+        report["_total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self.last_report = report
+        return results
+
+    @staticmethod
+    def _timed(fn, name: str, finished_at: dict):
+        try:
+            return fn()
+        finally:
+            finished_at[name] = time.perf_counter()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
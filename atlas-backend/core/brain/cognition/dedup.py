@@ -0,0 +1,147 @@
+"""
+Dedup Index — cheap duplicate checks that run before a memory is embedded.
+
+Most facts offered to save_memory are repeats.  Two in-memory filters catch
+them without touching the encoder or the vector store:
+
+  1. exact   sha1 of the normalized words (NFKC, lowercase, no punctuation)
+  2. near    64-bit SimHash over word uni/bigrams, bucketed by four 16-bit
+             bands (any pair within 3 bits is guaranteed to share a band);
+             documents sharing a band are confirmed by Jaccard overlap of
+             the same features
+
+Only facts that pass both go on to the vector check.  The index is built
+from the collection on first use and kept current by store write listeners.
+"""
+
+import hashlib
+import re
+import threading
+from core.brain.cognition.embedding_cache import normalize_text
+
+_WORD = re.compile(r"\w+")
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_MIN_JACCARD = 0.8
+
+
+def _features(text: str) -> frozenset:
+    words = _WORD.findall(normalize_text(text))
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def _simhash(features: frozenset) -> int:
+    weights = [0] * 64
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _bands(fingerprint: int) -> list:
+    mask = (1 << _BAND_BITS) - 1
+    return [(i, fingerprint >> (i * _BAND_BITS) & mask) for i in range(_BANDS)]
+
+
+def _exact_key(text: str) -> str:
+    # Words only, so trailing punctuation and spacing do not defeat the exact check
+    return hashlib.sha1(" ".join(_WORD.findall(normalize_text(text))).encode("utf-8")).hexdigest()
+
+
+class DedupIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._exact = {}          # exact key -> doc ids
+        self._docs = {}           # doc_id -> (exact key, simhash, features)
+        self._buckets = {}        # (band, value) -> doc ids
+        self.stale = False
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ------------------------------------------------------------------
+    def build(self, ids: list, documents: list):
+        with self._lock:
+            self._exact.clear()
+            self._docs.clear()
+            self._buckets.clear()
+            for doc_id, text in zip(ids, documents):
+                self._add_locked(doc_id, text or "")
+            self.stale = False
+
+    def add(self, doc_id: str, text: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._add_locked(doc_id, text or "")
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _add_locked(self, doc_id: str, text: str):
+        key = _exact_key(text)
+        features = _features(text)
+        fingerprint = _simhash(features)
+        self._docs[doc_id] = (key, fingerprint, features)
+        self._exact.setdefault(key, set()).add(doc_id)
+        for band in _bands(fingerprint):
+            self._buckets.setdefault(band, set()).add(doc_id)
+
+    def _remove_locked(self, doc_id: str):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        key, fingerprint, _ = entry
+        self._discard(self._exact, key, doc_id)
+        for band in _bands(fingerprint):
+            self._discard(self._buckets, band, doc_id)
+
+    @staticmethod
+    def _discard(table: dict, key, doc_id: str):
+        ids = table.get(key)
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del table[key]
+
+    def on_change(self, event: str, payload: dict):
+        """CollectionHandle listener keeping the index in step with the store."""
+        ids = payload.get("ids") or []
+        if event == "delete" and not ids:
+            self.stale = True
+        elif event == "delete":
+            for doc_id in ids:
+                self.remove(doc_id)
+        elif payload.get("documents") is not None:
+            for doc_id, text in zip(ids, payload["documents"]):
+                self.add(doc_id, text)
+
+    # ------------------------------------------------------------------
+    def check(self, text: str):
+        """Return ("exact" | "near", doc_id) for a known duplicate, else None."""
+        key = _exact_key(text)
+        features = _features(text)
+        fingerprint = _simhash(features)
+        with self._lock:
+            ids = self._exact.get(key)
+            if ids:
+                self.exact_hits += 1
+                return "exact", next(iter(ids))
+            candidates = set()
+            for band in _bands(fingerprint):
+                candidates.update(self._buckets.get(band, ()))
+            for doc_id in candidates:
+                _, _, other_features = self._docs[doc_id]
+                union = len(features | other_features)
+                if union and len(features & other_features) / union >= _MIN_JACCARD:
+                    self.near_hits += 1
+                    return "near", doc_id
+            self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        return {"documents": len(self._docs), "exact_hits": self.exact_hits, "near_hits": self.near_hits, "misses": self.misses}
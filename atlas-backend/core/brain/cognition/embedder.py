@@ -0,0 +1,182 @@
+"""
+Embedding Service — one SentenceTransformer for the whole process.
+
+MemorySystem, Archivist, Consolidator and the LLM engine all share this
+instance instead of loading their own copy of the encoder.  Concurrent
+encode() calls from different threads are coalesced: whichever caller
+arrives while no forward pass is running becomes the batch leader and
+encodes every pending text in one go; the others simply wait for their rows.
+Every call goes through the EmbeddingCache first, so a string is only ever
+sent to the model once per cache lifetime.
+"""
+
+import threading
+import time
+import numpy as np
+from colorama import Fore
+from config import EMBEDDING_MODEL, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_DISK_ENTRIES
+from core.brain.cognition.embedding_cache import EmbeddingCache, normalize_text
+
+
+class _Request:
+    __slots__ = ("texts", "result", "error", "done")
+
+    def __init__(self, texts: list):
+        self.texts = texts
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingService:
+    """Singleton, thread-safe, micro-batching wrapper around SentenceTransformer."""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self.model_name = EMBEDDING_MODEL
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._pending = []
+        self._leader_active = False
+        self.load_seconds = 0.0
+        self._batches = 0
+        self._texts_encoded = 0
+        self._last_batch_ms = 0.0
+        self._total_batch_ms = 0.0
+        self._largest_batch = 0
+        self.cache = EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE, disk_path=EMBEDDING_CACHE_PATH,
+                                    disk_entries=EMBEDDING_CACHE_DISK_ENTRIES)
+
+    # ------------------------------------------------------------------
+    @property
+    def model(self):
+        """Lazily load the encoder (first use), exactly once per process."""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    print(Fore.LIGHTBLACK_EX + f" [EMBEDDER] Loading {self.model_name} (first use)...")
+                    t0 = time.perf_counter()
+                    self._model = SentenceTransformer(self.model_name)
+                    self.load_seconds = time.perf_counter() - t0
+                    print(Fore.LIGHTBLACK_EX + f" [EMBEDDER] Ready in {self.load_seconds:.2f}s (dim={self.dimension}).")
+        return self._model
+
+    def use_model(self, model, name: str = None, cache: EmbeddingCache = None):
+        """
+        Swap in a different encoder (benchmarks, offline tools).  *model* needs
+        ``encode(list) -> array`` and ``get_sentence_embedding_dimension()``.
+        The cache is replaced too, so vectors from the old model never leak.
+        """
+        with self._load_lock:
+            self._model = model
+            self.model_name = name or type(model).__name__
+            self.cache = cache or EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE, disk_path=None)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    # ------------------------------------------------------------------
+    def encode(self, texts):
+        """
+        Same contract as SentenceTransformer.encode: a single string gives a
+        1-D vector, a list of strings gives a 2-D (n, dim) float32 array.
+        """
+        single = isinstance(texts, str)
+        batch = [normalize_text(t) for t in ([texts] if single else texts)]
+        if not batch:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        found = {}
+        for text in batch:
+            if text not in found:
+                found[text] = self.cache.get(self.model_name, text)
+
+        missing = [text for text, vec in found.items() if vec is None]
+        if missing:
+            vectors = self._submit(missing)
+            self.cache.put_many(self.model_name, zip(missing, vectors))
+            found.update(zip(missing, vectors))
+
+        if single:
+            return found[batch[0]]
+        return np.stack([found[text] for text in batch])
+
+    def _submit(self, texts: list) -> np.ndarray:
+        request = _Request(texts)
+        with self._queue_lock:
+            self._pending.append(request)
+            lead = not self._leader_active
+            if lead:
+                self._leader_active = True
+
+        if lead:
+            self._drain()
+        request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _drain(self):
+        """Run forward passes until no request is left waiting."""
+        while True:
+            with self._queue_lock:
+                batch = self._pending
+                self._pending = []
+                if not batch:
+                    self._leader_active = False
+                    return
+
+            # Two threads missing the cache on the same string share one row
+            unique = list(dict.fromkeys(t for req in batch for t in req.texts))
+            try:
+                t0 = time.perf_counter()
+                vectors = np.asarray(self.model.encode(unique), dtype=np.float32)
+                self._record_batch(len(unique), (time.perf_counter() - t0) * 1000)
+                row = {text: i for i, text in enumerate(unique)}
+                for req in batch:
+                    req.result = vectors[[row[t] for t in req.texts]]
+            except Exception as e:
+                for req in batch:
+                    req.error = e
+            finally:
+                for req in batch:
+                    req.done.set()
+
+    def _record_batch(self, size: int, elapsed_ms: float):
+        self._batches += 1
+        self._texts_encoded += size
+        self._last_batch_ms = elapsed_ms
+        self._total_batch_ms += elapsed_ms
+        self._largest_batch = max(self._largest_batch, size)
+
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "dimension": self.dimension if self._model is not None else None,
+            "load_seconds": round(self.load_seconds, 3),
+            "batches": self._batches,
+            "texts_encoded": self._texts_encoded,
+            "largest_batch": self._largest_batch,
+            "last_batch_ms": round(self._last_batch_ms, 2),
+            "avg_batch_ms": round(self._total_batch_ms / self._batches, 2) if self._batches else 0.0,
+            "cache": self.cache.stats(),
+        }
+
+
+# Module-level convenience instance
+embedder = EmbeddingService()
@@ -0,0 +1,146 @@
+"""
+Embedding Cache — bounded LRU in front of the shared encoder.
+
+Keys are (model name, normalized text) so the same sentence asked three
+different ways in one turn ("Do you remember", "do you remember ",
+"DO YOU REMEMBER") is embedded once.  An optional SQLite tier keeps vectors
+across restarts; it is read on a memory miss and written through on put,
+one transaction per ``put_many`` batch.  The file is capped at
+``disk_entries`` rows: past that, the least recently used ones are pruned.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from colorama import Fore
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    # all-MiniLM-L6-v2 uses an uncased tokenizer, so lower-casing is lossless here
+    return _WHITESPACE.sub(' ', unicodedata.normalize("NFKC", text)).strip().lower()
+
+
+# Pruning goes this far below the cap, so it does not run on every batch
+_PRUNE_TO = 0.9
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int = 4096, disk_path: str = None, disk_entries: int = 50000):
+        self.max_entries = max_entries
+        self.disk_entries = disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        self._disk_rows = 0
+        self._touched = {}      # key -> last use, for disk hits not yet written back
+        if disk_path:
+            try:
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB, last_used REAL NOT NULL DEFAULT 0)")
+                columns = {row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")}
+                if "last_used" not in columns:
+                    self._db.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+                self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self._prune()
+                self._db.commit()
+            except Exception as e:
+                print(Fore.RED + f" [EMBED CACHE] Disk tier unavailable: {e}")
+                self._db = None
+
+    @staticmethod
+    def _key(model_name: str, norm_text: str) -> str:
+        return hashlib.sha1(f"{model_name}\x00{norm_text}".encode("utf-8")).hexdigest()
+
+    def get(self, model_name: str, norm_text: str):
+        key = self._key(model_name, norm_text)
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vec
+            if self._db is not None:
+                row = self._db.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row:
+                    vec = np.frombuffer(row[0], dtype=np.float32)
+                    self._insert(key, vec)
+                    self._touched[key] = time.time()
+                    self.disk_hits += 1
+                    return vec
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, norm_text: str, vector: np.ndarray):
+        self.put_many(model_name, [(norm_text, vector)])
+
+    def put_many(self, model_name: str, items):
+        """Cache (norm_text, vector) pairs; the disk tier gets one commit for all of them."""
+        rows = []
+        for norm_text, vector in items:
+            vec = np.asarray(vector, dtype=np.float32).copy()
+            vec.flags.writeable = False   # shared between callers — never mutate in place
+            rows.append((self._key(model_name, norm_text), vec))
+        if not rows:
+            return
+        with self._lock:
+            for key, vec in rows:
+                self._insert(key, vec)
+            if self._db is not None:
+                now = time.time()
+                try:
+                    self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vec, last_used) VALUES (?, ?, ?)",
+                                         [(key, vec.tobytes(), now) for key, vec in rows])
+                    # Disk hits since the last write count as uses for the LRU prune
+                    self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                         [(used, key) for key, used in self._touched.items()])
+                    self._touched.clear()
+                    self._disk_rows += len(rows)     # misses, so new rows; _prune recounts
+                    self._prune()
+                    self._db.commit()
+                except Exception as e:
+                    self._db.rollback()
+                    print(Fore.RED + f" [EMBED CACHE] Disk write failed: {e}")
+
+    def _prune(self):
+        """Drop the least recently used disk rows once the file is over ``disk_entries``."""
+        if not self.disk_entries or self._disk_rows <= self.disk_entries:
+            return
+        excess = self._disk_rows - int(self.disk_entries * _PRUNE_TO)
+        self._db.execute("DELETE FROM embeddings WHERE key IN "
+                         "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,))
+        self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        print(Fore.CYAN + f" [EMBED CACHE] Pruned disk tier to {self._disk_rows} vectors.")
+
+    def _insert(self, key: str, vec: np.ndarray):
+        self._entries[key] = vec
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "disk_tier": self._db is not None,
+            "disk_entries": self._disk_rows,
+        }
@@ -2,6 +2,12 @@ import ollama
 from colorama import Fore
 from config import BUTLER_MODEL
 
+
+def linear_plan(steps: list) -> list:
+    """Wrap ordered step strings as plan_graph nodes, each depending on the one before."""
+    return [{"id": i, "step": step, "after": [i - 1] if i else []} for i, step in enumerate(steps)]
+
+
 class Executive:
     def __init__(self, bus, model_name=BUTLER_MODEL):
         self.bus = bus
@@ -31,4 +37,50 @@ class Executive:
                     return steps
         except Exception as e:
             print(Fore.RED + f" [EXECUTIVE] Planning failed: {e}")
-        return [objective]
\ No newline at end of file
+        return [objective]
+
+    def plan_graph(self, objective: str) -> list:
+        """
+        Plan *objective* as a dependency graph: nodes {"id", "step", "after"}
+        where "after" lists the ids of earlier steps whose results the step
+        needs.  Steps with no path between them can run concurrently.  Falls
+        back to a linear chain when the planner returns plain steps.
+        """
+        prompt = (
+            "You are a task planner for an AI agent. Break this objective into concrete steps and say which earlier steps each one needs.\n"
+            "Rules: Maximum 5 steps. Each step must be a single, actionable instruction for a coding worker.\n"
+            "\"after\" lists the 0-based indices of EARLIER steps whose results this step uses. Steps that do not need each other must not list each other.\n"
+            "Output ONLY a JSON array of objects. No explanation. No markdown.\n"
+            "Example: [{\"step\": \"Search the web for FastAPI release notes\", \"after\": []}, "
+            "{\"step\": \"Search the web for Flask release notes\", \"after\": []}, "
+            "{\"step\": \"Write compare.md summarising both results\", \"after\": [0, 1]}]\n"
+            f"Objective: {objective}\nSteps:"
+        )
+        try:
+            response = ollama.generate(
+                model=self.model,
+                prompt=prompt,
+                options={"temperature": 0.0, "top_p": 0.1, "num_predict": 300}
+            )['response'].strip()
+            import json, re
+            match = re.search(r'\[.*\]', response, re.DOTALL)
+            if match:
+                items = json.loads(match.group(0))
+                if items and all(isinstance(i, str) for i in items):
+                    nodes = linear_plan([s.strip() for s in items if s.strip()])
+                else:
+                    nodes = []
+                    ids = {}      # planner index -> node id (invalid items are dropped)
+                    for position, item in enumerate(items):
+                        if not isinstance(item, dict) or not str(item.get("step", "")).strip():
+                            continue
+                        # Only edges to earlier steps are kept, which also rules out cycles
+                        after = sorted({ids[d] for d in item.get("after") or [] if isinstance(d, int) and d in ids})
+                        ids[position] = len(nodes)
+                        nodes.append({"id": len(nodes), "step": str(item["step"]).strip(), "after": after})
+                if nodes:
+                    self.bus.publish("plan_created", [n["step"] for n in nodes])
+                    return nodes
+        except Exception as e:
+            print(Fore.RED + f" [EXECUTIVE] Graph planning failed: {e}")
+        return linear_plan(self.plan_execution(objective))
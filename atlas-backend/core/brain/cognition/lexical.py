@@ -0,0 +1,124 @@
+"""
+Lexical Index — in-process BM25 over the documents of a Chroma collection.
+
+Embeddings are good at paraphrase and bad at exact terms: "what GPU do I
+have" only finds "User has an RTX 5050" if the vector happens to land under
+the recall threshold.  This inverted index scores by term overlap instead,
+and MemorySystem uses it in hybrid mode to lift vector results that share the
+query's terms, and to add keyword-only results that cover most of them.
+
+The index is built once from the collection, then kept current through the
+store's write listeners (add / update / delete), so it never re-reads the
+collection after startup.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by do does did for from had has have he her his i if in into is it its
+me my of on or our she so than that the their them then there these they this to was we were what when
+where which who why will with you your about can could would should user tudor
+""".split())
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class LexicalIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings = {}      # term -> {doc_id: term frequency}
+        self._doc_terms = {}     # doc_id -> Counter (kept for removal)
+        self._doc_len = {}       # doc_id -> token count
+        self._total_len = 0
+        self.stale = False       # set when a write could not be applied incrementally
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    # ------------------------------------------------------------------
+    def build(self, ids: list, documents: list):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._total_len = 0
+            for doc_id, text in zip(ids, documents):
+                self._add_locked(doc_id, text or "")
+            self.stale = False
+
+    def add(self, doc_id: str, text: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._add_locked(doc_id, text or "")
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _add_locked(self, doc_id: str, text: str):
+        terms = Counter(tokenize(text))
+        self._doc_terms[doc_id] = terms
+        self._doc_len[doc_id] = sum(terms.values())
+        self._total_len += self._doc_len[doc_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _remove_locked(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(doc_id, 0)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    # ------------------------------------------------------------------
+    def on_change(self, event: str, payload: dict):
+        """CollectionHandle listener keeping the index in step with the store."""
+        ids = payload.get("ids") or []
+        if event == "delete" and not ids:
+            self.stale = True        # delete(where=...): ids unknown, rebuild on next search
+        elif event == "delete":
+            for doc_id in ids:
+                self.remove(doc_id)
+        elif payload.get("documents") is not None:
+            for doc_id, text in zip(ids, payload["documents"]):
+                self.add(doc_id, text)
+
+    # ------------------------------------------------------------------
+    def search(self, query: str, n: int = 10) -> list:
+        """Return up to *n* (doc_id, score) pairs, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not terms or n_docs == 0:
+                return []
+            avg_len = self._total_len / n_docs or 1.0
+            scores = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1.0 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = tf + self.k1 * (1.0 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+    def overlap(self, query: str, doc_id: str) -> tuple:
+        """(query terms found in the document, distinct query terms)."""
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_terms = self._doc_terms.get(doc_id) or {}
+            return sum(1 for t in terms if t in doc_terms), len(terms)
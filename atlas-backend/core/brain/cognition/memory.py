@@ -1,55 +1,346 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
 from datetime import datetime
+import threading
 import uuid
+import numpy as np
+from colorama import Fore
 from config import MEMORY_DB_PATH
+from core.brain.cognition.embedder import embedder as _shared_embedder
+from core.brain.cognition.store import store
+from core.brain.cognition.lexical import LexicalIndex
+from core.brain.cognition.dedup import DedupIndex
+from core.brain.cognition.scoring import MemoryScorer, AccessTracker
+
+# Sort keys for list_memories: metadata field, descending?
+_LIST_SORTS = {
+    "importance": ("importance", True),
+    "recent":     ("timestamp", True),
+    "oldest":     ("timestamp", False),
+}
+
+
+# Candidates ranked once per search_page query; pages are cut from this list
+_SEARCH_POOL = 200
+_SEARCH_CACHE_SIZE = 8
+
+# Hybrid recall: a keyword-only hit needs this share of the query's terms, and at
+# least two of them (all of them for a one-term query); a vector hit gains up to
+# _LEXICAL_BOOST relevance for the query terms it contains
+_LEXICAL_MIN_COVERAGE = 0.6
+_LEXICAL_MIN_TERMS = 2
+_LEXICAL_BOOST = 0.1
+
+# (db path, index class) -> (collection handle, index): in-memory indexes over the
+# collection documents, shared by every MemorySystem on that path
+_doc_indexes = {}
+_lexical_lock = threading.Lock()
+
+# db path -> AccessTracker (recall hit counts, flushed in batches)
+_access_trackers = {}
+
+
+def _as_record(memory_id: str, text: str, meta: dict, distance: float = None) -> dict:
+    meta = meta or {}
+    record = {
+        "id":         memory_id,
+        "text":       text,
+        "importance": meta.get("importance", 5.0),
+        "tags":       meta.get("tags", "").split(",") if meta.get("tags") else [],
+        "timestamp":  meta.get("timestamp", ""),
+        "access_count": int(meta.get("access_count", 0)),
+    }
+    if distance is not None:
+        record["distance"] = round(float(distance), 4)
+        record["relevance"] = 1.0 - float(distance)
+    return record
+
+
+class _IndexFeed:
+    """
+    Store listener in front of a document index.  While a fresh index is
+    built outside the write lock, writes are queued here and replayed into
+    it before it is swapped in.  Listeners run under the write lock.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.backlog = None
+
+    def __call__(self, event: str, payload: dict):
+        if self.backlog is not None:
+            self.backlog.append((event, payload))
+        elif self.index is not None:
+            self.index.on_change(event, payload)
+
 
 class MemorySystem:
-    def __init__(self, db_path=MEMORY_DB_PATH):
-        self.client = chromadb.PersistentClient(path=db_path)
-        self._embedder = None   # lazy-loaded to avoid VRAM hit at import time
-        self.collection = self.client.get_or_create_collection(
-            name="atlas_long_term",
-            metadata={"hnsw:space": "cosine"}
-        )
+    def __init__(self, db_path=MEMORY_DB_PATH, scorer=None):
+        self.db_path = db_path
+        self.scorer = scorer or MemoryScorer()
+        with _lexical_lock:
+            if db_path not in _access_trackers:
+                tracker = AccessTracker(lambda: store.collection("atlas_long_term", path=db_path))
+                store.on_flush(tracker.flush)
+                _access_trackers[db_path] = tracker
+        self.access = _access_trackers[db_path]
+        self._index_lock = threading.Lock()
+        self._list_index = None       # (collection version, [(id, importance, timestamp, tags)])
+        self._search_cache = {}       # (query, tags, threshold, collection version) -> ranked records
+
+    @property
+    def collection(self):
+        # Shared handle from the process-wide store (one client per db path)
+        return store.collection("atlas_long_term", path=self.db_path)
 
     @property
     def embedder(self):
-        if self._embedder is None:
-            print("[MEMORY] Loading SentenceTransformer (first use)...")
-            self._embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        return self._embedder
+        # Process-wide encoder, lazy-loaded on first encode to avoid a VRAM hit at import time
+        return _shared_embedder
 
     def save_memory(self, text: str, importance: float = 5.0, tags: list = None) -> bool:
-        if self.collection.count() > 0 and self.recall(text, n_results=1, similarity_threshold=0.25):
-            return False
-        self.collection.add(
-            documents=[text],
-            embeddings=[self.embedder.encode(text).tolist()],
-            ids=[str(uuid.uuid4())],
-            metadatas=[{
-                "timestamp": datetime.now().isoformat(),
-                "importance": importance,
-                "tags": ",".join(tags or []),
-                "confirmed": True,
-            }]
-        )
-        return True
+        return bool(self.save_memories([text], importance=importance, tags=tags))
 
-    def recall(self, query: str, n_results: int = 2, similarity_threshold: float = 0.7) -> list:
-        if self.collection.count() == 0:
+    def save_memories(self, batch: list, importance: float = 5.0, tags: list = None, threshold: float = 0.25) -> list:
+        """
+        Save several facts at once: one encode, one nearest-neighbour query
+        against the store, an in-batch similarity check, one add.  Items are
+        strings or dicts with ``text`` and optional ``importance``/``tags``.
+        Exact and near-verbatim repeats are rejected by the dedup index before
+        anything is embedded; of the rest, a fact within cosine distance
+        *threshold* of a stored memory or of an earlier fact in the batch is
+        skipped.  Returns the texts saved.
+        """
+        dedup = self.dedup_index()
+        items = []
+        for item in batch:
+            if isinstance(item, str):
+                item = {"text": item}
+            text = (item.get("text") or "").strip()
+            if text and dedup.check(text) is None:
+                items.append((text, item.get("importance", importance), item.get("tags", tags)))
+        if not items:
             return []
+
+        vectors = np.atleast_2d(self.embedder.encode([text for text, _, _ in items]))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = vectors / np.maximum(norms, 1e-12)
+
+        # In-batch: greedily keep a fact only if it is not a near-copy of one already kept
+        similarity = unit @ unit.T
+        keep = []
+        for i in range(len(items)):
+            if all(similarity[i, j] <= 1.0 - threshold for j in keep):
+                keep.append(i)
+
+        with store.write_lock:
+            total = self.collection.count()
+            if total > 0:
+                results = self.collection.query(
+                    query_embeddings=vectors[keep].tolist(),
+                    n_results=1,
+                    include=["distances"]
+                )
+                distances = results.get("distances") or []
+                keep = [i for i, d in zip(keep, distances) if not d or d[0] >= threshold]
+            if not keep:
+                return []
+
+            now = datetime.now().isoformat()
+            self.collection.add(
+                documents=[items[i][0] for i in keep],
+                embeddings=vectors[keep].tolist(),
+                ids=[str(uuid.uuid4()) for _ in keep],
+                metadatas=[{
+                    "timestamp": now,
+                    "importance": items[i][1],
+                    "tags": ",".join(items[i][2] or []),
+                    "confirmed": True,
+                } for i in keep]
+            )
+        return [items[i][0] for i in keep]
+
+    def recall(self, query: str, n_results: int = 2, similarity_threshold: float = 0.7, query_embedding=None, mode: str = "vector") -> list:
+        records = self.search(query, n_results, similarity_threshold, query_embedding=query_embedding, mode=mode)
+        self.access.record([r["id"] for r in records])
+        return [r["text"] for r in records]
+
+    def search(self, query: str, n_results: int = 20, similarity_threshold: float = 0.7, tags: list = None, query_embedding=None, mode: str = "vector") -> list:
+        """
+        Like recall(), but returns records (id, text, metadata, distance)
+        straight from the query.  ``mode="hybrid"`` adds BM25 over the same
+        collection: vector hits that contain the query's terms rank higher, and
+        a memory the embedding misses is added only if it covers most of the
+        query's terms.
+        A pool of 3 x n_results candidates is fetched once and ranked by
+        ``self.scorer``.
+        """
+        total = self.collection.count()
+        if total == 0:
+            return []
+        if query_embedding is None:
+            query_embedding = self.embedder.encode(query)
+        fetch = n_results * 3
         results = self.collection.query(
-            query_embeddings=[self.embedder.encode(query).tolist()],
-            n_results=min(n_results, self.collection.count()),
+            query_embeddings=[list(map(float, query_embedding))],
+            n_results=min(fetch, total),
             include=["documents", "distances", "metadatas"]
         )
+        ids = results['ids'][0] if results.get('ids') else []
         docs = results['documents'][0] if results['documents'] else []
         dists = results['distances'][0] if results.get('distances') else []
         metas = results['metadatas'][0] if results.get('metadatas') else [{}] * len(docs)
-        filtered = [(doc, meta) for doc, dist, meta in zip(docs, dists, metas) if dist < similarity_threshold]
-        filtered.sort(key=lambda x: float(x[1].get("importance", 5.0)), reverse=True)
-        return [doc for doc, _ in filtered]
+        records = [
+            _as_record(i, doc, meta, dist)
+            for i, doc, dist, meta in zip(ids, docs, dists, metas) if dist < similarity_threshold
+        ]
+        if mode == "hybrid":
+            records = self._fuse_lexical(query, records, fetch, similarity_threshold)
+        if tags:
+            wanted = set(tags)
+            records = [r for r in records if wanted.issubset(r["tags"])]
+        for record in records:
+            record["access_count"] += self.access.pending(record["id"])
+        return self.scorer.rank(records)[:n_results]
+
+    # ------------------------------------------------------------------
+    def lexical_index(self) -> LexicalIndex:
+        """BM25 index over this collection, built on first use and kept current by write listeners."""
+        return self._document_index(LexicalIndex)
+
+    def dedup_index(self) -> DedupIndex:
+        """Exact-hash / SimHash duplicate filter, built on first use and kept current by write listeners."""
+        return self._document_index(DedupIndex)
+
+    def warm_indexes(self) -> threading.Thread:
+        """
+        Build the lexical and dedup indexes on a background thread.  Otherwise
+        the first hybrid recall builds the lexical index inside its context
+        source timeout and comes back empty.
+        """
+        def build():
+            for get_index in (self.lexical_index, self.dedup_index):
+                try:
+                    get_index()
+                except Exception as e:
+                    print(Fore.RED + f" [MEMORY] Index warm-up failed: {e}")
+
+        thread = threading.Thread(target=build, daemon=True)
+        thread.start()
+        return thread
+
+    def _document_index(self, index_cls):
+        collection = self.collection
+        key = (self.db_path, index_cls)
+        handle, feed = _doc_indexes.get(key, (None, None))
+        if handle is collection and feed.index is not None and not feed.index.stale:
+            return feed.index
+        with _lexical_lock:
+            handle, feed = _doc_indexes.get(key, (None, None))
+            if handle is collection and feed.index is not None and not feed.index.stale:
+                return feed.index
+            if handle is not collection:
+                # First use, or the store was closed and reopened with a fresh handle
+                feed = _IndexFeed()
+            # Only the snapshot runs under the write lock; hashing/tokenizing a large
+            # collection does not, and writes made meanwhile are replayed afterwards
+            with store.write_lock:
+                if handle is not collection:
+                    collection.subscribe(feed)
+                feed.backlog = []
+                got = collection.get(include=["documents"]) if collection.count() > 0 else {"ids": [], "documents": []}
+            index = index_cls()
+            try:
+                index.build(got["ids"], got["documents"])
+            except Exception:
+                with store.write_lock:
+                    feed.backlog = None
+                raise
+            with store.write_lock:
+                for event, payload in feed.backlog:
+                    index.on_change(event, payload)
+                feed.index, feed.backlog = index, None
+            _doc_indexes[key] = (collection, feed)
+        return feed.index
+
+    def _fuse_lexical(self, query: str, vector_records: list, n: int, similarity_threshold: float) -> list:
+        index = self.lexical_index()
+        by_id = {r["id"]: r for r in vector_records}
+        coverage = {}
+        for memory_id, _ in index.search(query, n=n):
+            matched, total = index.overlap(query, memory_id)
+            if memory_id in by_id:
+                coverage[memory_id] = matched / total
+            elif matched >= min(_LEXICAL_MIN_TERMS, total) and matched / total >= _LEXICAL_MIN_COVERAGE:
+                coverage[memory_id] = matched / total
+
+        missing = [memory_id for memory_id in coverage if memory_id not in by_id]
+        if missing:
+            got = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for memory_id, doc, meta in zip(got["ids"], got["documents"], got["metadatas"]):
+                # Never more relevant than a vector hit right at the threshold
+                by_id[memory_id] = dict(_as_record(memory_id, doc, meta), relevance=(1.0 - similarity_threshold) * coverage[memory_id])
+        for memory_id, record in by_id.items():
+            if "distance" in record and memory_id in coverage:
+                record["relevance"] = min(1.0, record["relevance"] + _LEXICAL_BOOST * coverage[memory_id])
+        return sorted(by_id.values(), key=lambda r: r["relevance"], reverse=True)
+
+    def list_memories(self, limit: int = 50, offset: int = 0, sort: str = "importance", tags: list = None) -> dict:
+        """
+        One page of memories.  Sorting and tag filtering run on a metadata-only
+        index that is rebuilt only when the collection's write version moves;
+        documents are fetched for the requested page alone.
+        """
+        field, descending = _LIST_SORTS.get(sort, _LIST_SORTS["importance"])
+        rows = self._sorted_index(field, descending)
+        if tags:
+            wanted = set(tags)
+            rows = [r for r in rows if wanted.issubset(r[3])]
+        page_ids = [r[0] for r in rows[offset:offset + limit]]
+        memories = []
+        if page_ids:
+            got = self.collection.get(ids=page_ids, include=["documents", "metadatas"])
+            by_id = {i: (doc, meta) for i, doc, meta in zip(got["ids"], got["documents"], got["metadatas"])}
+            memories = [_as_record(i, *by_id[i]) for i in page_ids if i in by_id]
+        next_offset = offset + limit if offset + limit < len(rows) else None
+        return {"memories": memories, "total": len(rows), "offset": offset, "next_offset": next_offset}
+
+    def search_page(self, query: str, limit: int = 20, offset: int = 0, tags: list = None, similarity_threshold: float = 0.6) -> dict:
+        """
+        One page of search results.  The query is ranked once (up to
+        _SEARCH_POOL matches) and every page is a slice of that same list
+        until the collection changes, so paging never repeats or skips items.
+        """
+        collection = self.collection
+        key = (query, tuple(sorted(tags or [])), similarity_threshold, (id(collection), collection.version))
+        with self._index_lock:
+            ranked = self._search_cache.get(key)
+        if ranked is None:
+            ranked = self.search(query, n_results=_SEARCH_POOL, similarity_threshold=similarity_threshold, tags=tags)
+            with self._index_lock:
+                if len(self._search_cache) >= _SEARCH_CACHE_SIZE:
+                    self._search_cache.pop(next(iter(self._search_cache)))
+                self._search_cache[key] = ranked
+        next_offset = offset + limit if offset + limit < len(ranked) else None
+        return {"memories": ranked[offset:offset + limit], "offset": offset, "next_offset": next_offset}
+
+    def _sorted_index(self, field: str, descending: bool) -> list:
+        collection = self.collection
+        with self._index_lock:
+            cached = self._list_index
+            if cached is None or cached[0] != (id(collection), collection.version):
+                rows = []
+                if collection.count() > 0:
+                    got = collection.get(include=["metadatas"])
+                    for memory_id, meta in zip(got["ids"], got["metadatas"]):
+                        meta = meta or {}
+                        tags = meta.get("tags", "").split(",") if meta.get("tags") else []
+                        rows.append((memory_id, float(meta.get("importance", 5.0)), str(meta.get("timestamp", "")), tags))
+                self._list_index = cached = ((id(collection), collection.version), rows, {})
+            by_sort = cached[2]
+            key = (field, descending)
+            if key not in by_sort:
+                column = 1 if field == "importance" else 2
+                by_sort[key] = sorted(cached[1], key=lambda r: r[column], reverse=descending)
+            return by_sort[key]
 
     def forget(self, query: str, threshold: float = 0.3) -> bool:
         if self.collection.count() == 0:
@@ -57,14 +348,11 @@ class MemorySystem:
         results = self.collection.query(
             query_embeddings=[self.embedder.encode(query).tolist()],
             n_results=1,
-            include=["documents", "distances"]
+            include=["distances"]
         )
-        if not results['documents'] or not results['documents'][0]:
+        if not results['ids'] or not results['ids'][0]:
             return False
         if results['distances'][0][0] > threshold:
             return False
-        match = self.collection.get(where_document={"$contains": results['documents'][0][0][:50]})
-        if match['ids']:
-            self.collection.delete(ids=[match['ids'][0]])
-            return True
-        return False
\ No newline at end of file
+        self.collection.delete(ids=[results['ids'][0][0]])
+        return True
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Prototype Classifier — nearest-prototype scoring for several labels at once.
+
+Every example phrase is embedded once, L2-normalized and stacked into one
+contiguous float32 matrix grouped by label.  Scoring a query is a single
+matrix-vector product followed by a per-label max, so asking "is this a
+recall / forget / schedule / imagine request?" costs one BLAS call no
+matter how many labels or examples there are.
+"""
+
+import threading
+import numpy as np
+
+
+class PrototypeClassifier:
+    def __init__(self, encoder, prototypes: dict = None):
+        self.encoder = encoder
+        self._lock = threading.Lock()
+        self._examples = {}                              # label -> list[np.ndarray]
+        self._labels = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._starts = np.zeros(0, dtype=np.intp)
+        for label, examples in (prototypes or {}).items():
+            self.add(label, examples)
+
+    @property
+    def labels(self) -> list:
+        return list(self._labels)
+
+    def add(self, label: str, examples: list):
+        """Add (or extend) a labelled prototype set and rebuild the matrix."""
+        if not examples:
+            return
+        vectors = np.atleast_2d(np.asarray(self.encoder.encode(list(examples)), dtype=np.float32))
+        vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9)
+        with self._lock:
+            self._examples.setdefault(label, []).append(vectors)
+            self._rebuild()
+
+    def _rebuild(self):
+        labels = list(self._examples)
+        blocks = [np.vstack(self._examples[label]) for label in labels]
+        sizes = [len(b) for b in blocks]
+        self._matrix = np.ascontiguousarray(np.vstack(blocks), dtype=np.float32)
+        self._starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+        self._labels = labels
+
+    def score(self, vector) -> dict:
+        """Max cosine similarity of *vector* against each label's prototypes."""
+        if not self._labels:
+            return {}
+        v = np.asarray(vector, dtype=np.float32)
+        v = v / (np.linalg.norm(v) + 1e-9)
+        with self._lock:
+            sims = self._matrix @ v
+            best = np.maximum.reduceat(sims, self._starts)
+            labels = self._labels
+        return {label: float(s) for label, s in zip(labels, best)}
+
+    def score_text(self, text: str) -> dict:
+        return self.score(self.encoder.encode(text))
+
+    def best(self, vector, threshold: float = 0.0):
+        """Return (label, score) for the top label, or (None, score) below threshold."""
+        scores = self.score(vector)
+        if not scores:
+            return None, 0.0
+        label = max(scores, key=scores.get)
+        return (label if scores[label] > threshold else None), scores[label]
@@ -0,0 +1,118 @@
+"""
+Memory Scoring — ranks a recalled candidate pool locally in one pass.
+
+    score = w_sim * relevance + w_imp * importance/10
+          + w_rec * 0.5 ** (age_days / half_life) + w_acc * log-scaled access count
+
+Relevance is 1 - cosine distance (adjusted by keyword overlap in hybrid
+mode).  Memories with no timestamp (e.g. consolidated ones) get a neutral
+recency of 0.5.  Any object with a ``rank(records)`` method can replace
+MemoryScorer on a MemorySystem.
+
+AccessTracker counts how often each memory is recalled.  Counts live in
+memory and are written back as ``access_count`` / ``last_access`` metadata
+in one batched update every few minutes and whenever the store flushes.
+"""
+
+import math
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from colorama import Fore
+from core.brain.cognition.store import store
+from config import MEMORY_SCORE_WEIGHTS, MEMORY_RECENCY_HALF_LIFE_DAYS, MEMORY_ACCESS_FLUSH_SECONDS
+
+# Access count at which the frequency term saturates
+_ACCESS_SATURATION = 20
+
+
+def _age_days(stamp: str, now: float) -> float:
+    if not stamp:
+        return math.nan
+    try:
+        return max(0.0, (now - datetime.fromisoformat(stamp).timestamp()) / 86400.0)
+    except ValueError:
+        return math.nan
+
+
+class MemoryScorer:
+    def __init__(self, weights: dict = None, half_life_days: float = MEMORY_RECENCY_HALF_LIFE_DAYS):
+        self.weights = dict(MEMORY_SCORE_WEIGHTS, **(weights or {}))
+        self.half_life_days = half_life_days
+
+    def scores(self, records: list, now: float = None) -> np.ndarray:
+        if not records:
+            return np.zeros(0, dtype=np.float32)
+        now = now or time.time()
+        relevance = np.array([r.get("relevance", 0.0) for r in records], dtype=np.float32)
+        importance = np.array([float(r.get("importance", 5.0)) for r in records], dtype=np.float32) / 10.0
+        ages = np.array([_age_days(r.get("timestamp", ""), now) for r in records], dtype=np.float32)
+        access = np.array([r.get("access_count", 0) for r in records], dtype=np.float32)
+
+        recency = np.where(np.isnan(ages), 0.5, np.power(0.5, np.nan_to_num(ages) / self.half_life_days))
+        frequency = np.minimum(np.log1p(access) / math.log1p(_ACCESS_SATURATION), 1.0)
+        w = self.weights
+        return (w["similarity"] * relevance + w["importance"] * np.clip(importance, 0.0, 1.0)
+                + w["recency"] * recency + w["access"] * frequency)
+
+    def rank(self, records: list, now: float = None) -> list:
+        scores = self.scores(records, now)
+        for record, score in zip(records, scores):
+            record["score"] = round(float(score), 4)
+        return [records[i] for i in np.argsort(-scores, kind="stable")]
+
+
+class AccessTracker:
+    def __init__(self, collection_getter, flush_seconds: float = MEMORY_ACCESS_FLUSH_SECONDS):
+        self._collection = collection_getter
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._pending = {}          # id -> hits since last flush
+        self._last_access = {}      # id -> ISO time of the latest hit
+        self._last_flush = time.monotonic()
+        self._flushing = False
+
+    def pending(self, memory_id: str) -> int:
+        return self._pending.get(memory_id, 0)
+
+    def record(self, ids: list):
+        if not ids:
+            return
+        stamp = datetime.now().isoformat()
+        with self._lock:
+            for memory_id in ids:
+                self._pending[memory_id] = self._pending.get(memory_id, 0) + 1
+                self._last_access[memory_id] = stamp
+            due = not self._flushing and time.monotonic() - self._last_flush >= self.flush_seconds
+            if due:
+                self._flushing = True
+        if due:
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def flush(self):
+        """Merge pending counts into the stored metadata with one get and one update."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            last_access, self._last_access = self._last_access, {}
+            self._last_flush = time.monotonic()
+        try:
+            if not pending:
+                return
+            collection = self._collection()
+            with store.write_lock:
+                got = collection.get(ids=list(pending), include=["metadatas"])
+                if not got["ids"]:
+                    return
+                metadatas = []
+                for memory_id, meta in zip(got["ids"], got["metadatas"]):
+                    meta = dict(meta or {})
+                    meta["access_count"] = int(meta.get("access_count", 0)) + pending[memory_id]
+                    meta["last_access"] = last_access[memory_id]
+                    metadatas.append(meta)
+                # Access counters only: the list and search-page caches stay valid
+                collection.update(ids=got["ids"], metadatas=metadatas, versioned=False)
+        except Exception as e:
+            print(Fore.RED + f" [MEMORY] Access count flush failed: {e}")
+        finally:
+            self._flushing = False
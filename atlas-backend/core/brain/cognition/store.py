@@ -0,0 +1,185 @@
+"""
+Memory Store — one Chroma client per database directory, shared by the
+whole process.
+
+MemorySystem, Archivist, Consolidator, the tool registry and the API all ask
+the store for collection handles instead of opening their own
+PersistentClient, so the SQLite/HNSW files are loaded once.  Writes go
+through ``store.write_lock`` so a background consolidation never interleaves
+with a live save.  Components can hook into the store lifecycle:
+
+    on_open(cb)   cb(path, client)  after a client is first opened
+    on_flush(cb)  cb()              when store.flush() is called
+    on_close(cb)  cb()              once, at shutdown, before clients are dropped
+
+Collection handles are wrapped in CollectionHandle, which keeps the row
+count in process (adds increment it, deletes invalidate it) and a write
+version bumped on every mutation, so hot paths never issue a SQLite
+``count()`` just to learn whether a collection is empty.  Bookkeeping
+updates that no cache depends on (access counters) pass ``versioned=False``
+so they do not invalidate the caches keyed on the version.  Writes made by
+another process (scripts/) are not seen until the store is reopened.
+"""
+
+import threading
+import chromadb
+from colorama import Fore
+from config import MEMORY_DB_PATH
+
+
+class CollectionHandle:
+    """Chroma collection proxy with a cached count, a write version and change listeners."""
+
+    def __init__(self, collection, write_lock):
+        self._collection = collection
+        self._write_lock = write_lock
+        self._count = None
+        self.version = 0
+        self._listeners = []
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    def __getattr__(self, attr):
+        # query/get/peek/... go straight to the underlying collection
+        return getattr(self._collection, attr)
+
+    # ------------------------------------------------------------------
+    def count(self) -> int:
+        count = self._count
+        if count is None:
+            with self._write_lock:
+                if self._count is None:
+                    self._count = self._collection.count()
+                count = self._count
+        return count
+
+    def is_empty(self) -> bool:
+        return self.count() == 0
+
+    def subscribe(self, callback):
+        """callback(event, payload) after every write; event is 'add', 'update' or 'delete'."""
+        self._listeners.append(callback)
+
+    def _changed(self, event: str, payload: dict, versioned: bool = True):
+        if versioned:
+            self.version += 1
+        for callback in list(self._listeners):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(Fore.RED + f" [STORE] {self.name} listener failed: {e}")
+
+    # ------------------------------------------------------------------
+    def add(self, ids, documents=None, embeddings=None, metadatas=None, **kwargs):
+        with self._write_lock:
+            self._collection.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas, **kwargs)
+            if self._count is not None:
+                self._count += len(ids)
+            self._changed("add", {"ids": ids, "documents": documents, "metadatas": metadatas})
+
+    def update(self, ids, versioned: bool = True, **kwargs):
+        with self._write_lock:
+            self._collection.update(ids=ids, **kwargs)
+            self._changed("update", dict(kwargs, ids=ids), versioned)
+
+    def upsert(self, ids, **kwargs):
+        with self._write_lock:
+            self._collection.upsert(ids=ids, **kwargs)
+            self._count = None
+            self._changed("update", dict(kwargs, ids=ids))
+
+    def delete(self, ids=None, **kwargs):
+        with self._write_lock:
+            self._collection.delete(ids=ids, **kwargs)
+            # Unknown ids are ignored by Chroma, so the exact delta is not known here
+            self._count = None
+            self._changed("delete", {"ids": ids, **kwargs})
+
+
+class MemoryStore:
+    """Singleton owning the Chroma clients and the collection registry."""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._clients = {}        # path -> PersistentClient
+                    cls._instance._collections = {}    # (path, name) -> collection
+                    cls._instance._hooks = {"open": [], "flush": [], "close": []}
+                    cls._instance.write_lock = threading.RLock()
+        return cls._instance
+
+    # ------------------------------------------------------------------
+    def client(self, path: str = MEMORY_DB_PATH):
+        client = self._clients.get(path)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(path)
+            if client is None:
+                client = chromadb.PersistentClient(path=path)
+                self._clients[path] = client
+                opened = True
+            else:
+                opened = False
+        if opened:
+            print(Fore.LIGHTBLACK_EX + f" [STORE] Opened memory store at {path}")
+            self._run("open", path, client)
+        return client
+
+    def collection(self, name: str, path: str = MEMORY_DB_PATH, space: str = "cosine"):
+        key = (path, name)
+        handle = self._collections.get(key)
+        if handle is not None:
+            return handle
+        client = self.client(path)
+        with self._lock:
+            handle = self._collections.get(key)
+            if handle is None:
+                handle = CollectionHandle(
+                    client.get_or_create_collection(name=name, metadata={"hnsw:space": space}),
+                    self.write_lock,
+                )
+                self._collections[key] = handle
+        return handle
+
+    # ------------------------------------------------------------------
+    def on_open(self, callback):
+        self._hooks["open"].append(callback)
+        for path, client in list(self._clients.items()):
+            callback(path, client)
+
+    def on_flush(self, callback):
+        self._hooks["flush"].append(callback)
+
+    def on_close(self, callback):
+        self._hooks["close"].append(callback)
+
+    def _run(self, event: str, *args):
+        for callback in list(self._hooks[event]):
+            try:
+                callback(*args)
+            except Exception as e:
+                print(Fore.RED + f" [STORE] {event} hook failed: {e}")
+
+    def flush(self):
+        with self.write_lock:
+            self._run("flush")
+
+    def close(self):
+        """Flush and drop every handle; the next collection() call reopens."""
+        with self.write_lock:
+            self._run("flush")
+            self._run("close")
+            with self._lock:
+                self._collections.clear()
+                self._clients.clear()
+
+
+store = MemoryStore()
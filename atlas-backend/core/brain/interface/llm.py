@@ -1,9 +1,10 @@
 import ollama
-import numpy as np
 import threading
 from collections import deque
 from colorama import Fore
 from core.brain.cognition.memory import MemorySystem
+from core.brain.cognition.prototypes import PrototypeClassifier
+from core.brain.cognition.context import ContextAssembler
 from core.brain.autonomic.chronometer import Chronometer
 from core.brain.limbic.archivist import Archivist
 from core.brain.autonomic.interoception import Interoception
@@ -11,6 +12,7 @@ from core.brain.self.user_model import UserModel
 import re
 from config import BUTLER_MODEL, SHORT_TERM_MEMORY_SIZE
 from core.brain.interface.vram_manager import vram
+from core.brain.interface.prompt import PromptBuilder, ContextPacker, ContextBlock, PINNED
 
 _SYSTEM_PROMPT = (
     "You are ATLAS (ASPIRING THINKING LOCAL ADMINISTRATIVE SYSTEM), an advanced local engineering assistant.\n"
@@ -44,16 +46,82 @@ _SYSTEM_PROMPT = (
     "RULE-OUT-4: NEVER say the literal tag names [LONG-TERM MEMORY], [PAST EPISODES], or [LIVE SYSTEM VITALS] aloud.\n"
 )
 
+_INTENT_PROTOTYPES = {
+    "recall": [
+        "do you remember", "can you recall", "what do you know about",
+        "did i tell you", "what did we do", "yesterday", "last time"
+    ],
+    "forget": [
+        "forget that", "erase that fact", "remove that from memory",
+        "delete what you know about", "stop remembering"
+    ],
+    "schedule": [
+        "remind me in", "schedule a task", "set a reminder",
+        "remind me later to", "in ten minutes remind me"
+    ],
+    "imagine": [
+        "imagine if", "what if", "hypothetically", "suppose that", "brainstorm ideas"
+    ],
+}
+
+_FALLBACK_GOODBYE = "Good night, Sir. I'll be here."
+
+# Greeting buckets by hour, checked in order: (hour it ends at, time of day, situation, tone examples).
+# generate_greeting and fallback_phrases both read this table.
+_GREETING_BUCKETS = [
+    (5, "Late Night", "It is past midnight. Tudor is awake and working.", [
+        "Still at it, Sir? You're going to regret this in about six hours.",
+        "Good to see you, Sir. The rest of the world clocked out some time ago.",
+        "Working late again, Sir? You will feel it in the morning, I'm afraid.",
+    ]),
+    (11, "Morning", "It is morning. Tudor is starting his day early.", [
+        "Good morning, Sir. Getting in the workshop early today?",
+        "Good morning, Sir. Up before noon — I'll mark it in the calendar.",
+        "Good to see you, Sir. Early start today?",
+    ]),
+    (14, "Late Morning", "It is late morning, nearly noon.", [
+        "Good morning, Sir. And I use that term generously.",
+        "Good morning, Sir. Barely, but it still counts.",
+        "Good afternoon, Sir. Someone's been sleeping in today?",
+    ]),
+    (17, "Afternoon", "It is mid-afternoon. The morning is long gone.", [
+        "Good afternoon, Sir. The morning filed a missing persons report.",
+        "Good afternoon, Sir. Someone's been sleeping in today?",
+        "Good to see you, Sir. Half the day's already gone — shall we make use of the rest?",
+    ]),
+    (22, "Evening", "It is evening. Tudor is sitting down to work after the day.", [
+        "Good evening, Sir. Finally got some free time for the projects?",
+        "Good evening, Sir. The day's shift is over, I take it?",
+        "Good to see you, Sir. The evening's yours — what are we working on?",
+    ]),
+    (24, "Late Night", "It is late at night. Tudor is still awake.", [
+        "Working late again, Sir? You will feel it in the morning, I'm afraid.",
+        "Good evening, Sir. This is becoming a bit of a habit.",
+        "Good to see you, Sir. Though I'd have preferred to see you three hours ago.",
+    ]),
+]
+
+
+def _greeting_bucket(hour: int) -> tuple:
+    """(time of day, situation, examples) for an hour of the day."""
+    for ends, tod, situation, examples in _GREETING_BUCKETS:
+        if hour < ends:
+            return tod, situation, examples
+    return _GREETING_BUCKETS[-1][1:]
+
 class LLMEngine:
     def __init__(self, bus, model_name=BUTLER_MODEL, system_prompt=None):
         self.session_first_input = None
         self.bus = bus
         self.model_name = model_name
         self.memory = MemorySystem()
+        self.memory.warm_indexes()      # first-turn hybrid recall must not build BM25 inside its timeout
         self.chronometer = Chronometer()
         self.archivist = Archivist()
         self.interoception = Interoception(bus=None)
         self.user_model = UserModel()
+        self.context_assembler = ContextAssembler()
+        self.prompt_builder = PromptBuilder(packer=ContextPacker.for_model(model_name))
         self.short_term_memory = deque(maxlen=SHORT_TERM_MEMORY_SIZE)
         self.session_history = []
         self.last_interaction = {"user": "", "atlas": ""}
@@ -62,67 +130,14 @@ class LLMEngine:
         # Register butler model with VRAM manager
         vram.register("butler", self.model_name)
 
-        self.recall_intent_examples = [
-            "do you remember", "can you recall", "what do you know about",
-            "did i tell you", "what did we do", "yesterday", "last time"
-        ]
-        self.recall_intent_vectors = [self.memory.embedder.encode(p) for p in self.recall_intent_examples]
+        self.intent_classifier = PrototypeClassifier(self.memory.embedder, _INTENT_PROTOTYPES)
         self.system_prompt = system_prompt or _SYSTEM_PROMPT
 
     def generate_greeting(self) -> str:
         from datetime import datetime
         hour = datetime.now().hour
 
-        if hour < 5:
-            tod = "Late Night"
-            situation = "It is past midnight. Tudor is awake and working."
-            examples = [
-    "Still at it, Sir? You're going to regret this in about six hours.",
-    "Good to see you, Sir. The rest of the world clocked out some time ago.",
-    "Working late again, Sir? You will feel it in the morning, I'm afraid."
-]
-
-        elif 5 <= hour < 11:
-            tod = "Morning"
-            situation = "It is morning. Tudor is starting his day early."
-            examples = [
-    "Good morning, Sir. Getting in the workshop early today?",
-    "Good morning, Sir. Up before noon — I'll mark it in the calendar.",
-    "Good to see you, Sir. Early start today?"
-]
-        elif 11 <= hour < 14:
-            tod = "Late Morning"
-            situation = "It is late morning, nearly noon."
-            examples = [
-    "Good morning, Sir. And I use that term generously.",
-    "Good morning, Sir. Barely, but it still counts.",
-    "Good afternoon, Sir. Someone's been sleeping in today?"
-]
-        elif 14 <= hour < 17:
-            tod = "Afternoon"
-            situation = "It is mid-afternoon. The morning is long gone."
-            examples = [
-    "Good afternoon, Sir. The morning filed a missing persons report.",
-    "Good afternoon, Sir. Someone's been sleeping in today?",
-    "Good to see you, Sir. Half the day's already gone — shall we make use of the rest?"
-]
-        elif 17 <= hour < 22:
-            tod = "Evening"
-            situation = "It is evening. Tudor is sitting down to work after the day."
-            examples = [
-    "Good evening, Sir. Finally got some free time for the projects?",
-    "Good evening, Sir. The day's shift is over, I take it?",
-    "Good to see you, Sir. The evening's yours — what are we working on?"
-]
-
-        else:
-            tod = "Late Night"
-            situation = "It is late at night. Tudor is still awake."
-            examples = [
-    "Working late again, Sir? You will feel it in the morning, I'm afraid.",
-    "Good evening, Sir. This is becoming a bit of a habit.",
-    "Good to see you, Sir. Though I'd have preferred to see you three hours ago."
-]
+        tod, situation, examples = _greeting_bucket(hour)
 
         memory_ctx = ""
         if self.memory.collection.count() > 0:
@@ -230,12 +245,21 @@ class LLMEngine:
                 options={"temperature": 0.85, "num_predict": 30}
             )['response'].strip(' "\'\n')
         except Exception:
-            return "Good night, Sir. I'll be here."
+            return _FALLBACK_GOODBYE
+
+    def intent_scores(self, user_input: str) -> dict:
+        """One embedding, one matrix-vector product: a score per prototype label."""
+        return self.intent_classifier.score_text(user_input)
 
-    def _is_recall_intent(self, user_input: str, threshold: float = 0.40) -> bool:
-        iv = self.memory.embedder.encode(user_input.lower())
-        sims = [np.dot(iv, v) / (np.linalg.norm(iv) * np.linalg.norm(v) + 1e-9) for v in self.recall_intent_vectors]
-        return max(sims, default=0) > threshold
+    @staticmethod
+    def fallback_phrases() -> list:
+        """Fixed lines spoken when greeting/goodbye generation fails."""
+        times_of_day = dict.fromkeys(tod for _, tod, _, _ in _GREETING_BUCKETS)
+        return [f"Good {tod.lower()}, Sir." for tod in times_of_day] + [_FALLBACK_GOODBYE]
+
+    def _is_recall_intent(self, user_input: str, threshold: float = 0.40, scores: dict = None) -> bool:
+        scores = scores if scores is not None else self.intent_scores(user_input)
+        return scores.get("recall", 0.0) > threshold
 
     def synthesize_task(self, user_input: str) -> str:
         try:
@@ -286,8 +310,9 @@ class LLMEngine:
         except Exception:
             return user_input
 
-    def _extract_facts_bg(self, user_input: str):
+    def _extract_facts_bg(self, user_input: str, intent_scores: dict = None):
         input_lower = user_input.lower()
+        intent_scores = intent_scores or {}
         _ka = vram.get_keep_alive("butler")
 
         if "when i say" in input_lower and any(x in input_lower for x in ["respond with", "reply with"]):
@@ -319,7 +344,10 @@ class LLMEngine:
                 return
 
         forget_kws = ["forget", "erase", "remove"]
-        if any(kw in input_lower for kw in forget_kws) and any(x in input_lower for x in ["fact", "that", "about"]):
+        # This path deletes long-term memory: an explicit forget keyword is always required;
+        # the prototype score can only stand in for the "fact / that / about" context words
+        if any(kw in input_lower for kw in forget_kws) and (
+                any(x in input_lower for x in ["fact", "that", "about"]) or intent_scores.get("forget", 0.0) > 0.60):
             try:
                 prompt = (
                     "Extract the exact fact to forget. Output ONLY the fact, nothing else. If none, output 'None'.\n"
@@ -372,91 +400,113 @@ class LLMEngine:
         if self.session_first_input is None:
             self.session_first_input = user_input
 
-        explicit_recall = self._is_recall_intent(user_input)
+        # One query embedding shared by the intent classifier and every vector lookup
+        query_vec = self.memory.embedder.encode(user_input)
+        intent_scores = self.intent_classifier.score(query_vec)
+        explicit_recall = self._is_recall_intent(user_input, scores=intent_scores)
+
+        sources = {
+            "memory": lambda: self.memory.recall(
+                user_input,
+                n_results=5 if explicit_recall else 3,
+                similarity_threshold=0.40 if explicit_recall else 0.30,
+                query_embedding=query_vec,
+                mode="hybrid"
+            ),
+            "episodes": lambda: self.archivist.recall_episodes(
+                user_input,
+                n=3 if explicit_recall else 1,
+                threshold=0.45 if explicit_recall else 0.35,
+                query_embedding=query_vec
+            ),
+            "vitals": self.interoception.get_vitals,
+            "profile": self.user_model.get_context_string,
+        }
+        if task_queue:
+            sources["tasks"] = task_queue.list_pending_text
+        gathered = self.context_assembler.gather(sources)
+        timings = ", ".join(f"{k}={v['ms']}ms" for k, v in self.context_assembler.last_report.items() if k != "_total_ms")
+        print(Fore.LIGHTBLACK_EX + f" [CONTEXT] {timings} (total {self.context_assembler.last_report['_total_ms']}ms)")
 
         long_term_context = ""
         episodic_context = ""
 
-        if self.memory.collection.count() > 0:
-            retrieved = self.memory.recall(
-                user_input,
-                n_results=5 if explicit_recall else 3,
-                similarity_threshold=0.40 if explicit_recall else 0.30
-            )
-            # ...
-
-        episodes = self.archivist.recall_episodes(
-            user_input,
-            n=3 if explicit_recall else 1,
-            threshold=0.45 if explicit_recall else 0.35 
-        )
+        retrieved = gathered.get("memory")
+        if retrieved:
+            long_term_context = "\n".join(f"- {fact}" for fact in retrieved)
 
+        episodes = gathered.get("episodes")
         if episodes:
             episodic_context = "\n".join(episodes)
             print(Fore.MAGENTA + f" [ARCHIVIST] Retrieved {len(episodes)} episodes.")
 
-        try:
-            vitals = self.interoception.get_vitals()
+        vitals = gathered.get("vitals")
+        if vitals:
             vitals_text = f"[LIVE SYSTEM VITALS]\nCPU: {int(vitals['cpu_percent'])}% | RAM: {int(vitals['ram_percent'])}% | Disk: {int(vitals['disk_percent'])}%"
-        except:
+        else:
             vitals_text = "[LIVE SYSTEM VITALS]\nOffline"
 
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "system", "content": f"{self.chronometer.get_time_context()}\n\n{vitals_text}"},
-        ]
-
-        if self.session_first_input:
-            messages.append({
-                "role": "system",
-                "content": f"[SESSION ANCHOR] The first message Tudor sent this session was: '{self.session_first_input}'"
-            })
-
-        user_ctx = self.user_model.get_context_string()
+        # Stable prefix first so Ollama can reuse its KV cache; per-turn material goes last.
+        # Priorities decide what the packer trims first when the prompt is over budget.
+        blocks = [ContextBlock("system", self.system_prompt, priority=PINNED)]
+        user_ctx = gathered.get("profile")
         if user_ctx:
-            messages.append({"role": "system", "content": f"[USER PROFILE]\n{user_ctx}"})
-
-        if task_queue:
-            pending = task_queue.list_pending_text()
-            if "No pending" not in pending:
-                messages.append({"role": "system", "content": f"[PENDING TASKS]\n{pending}"})
-
+            blocks.append(ContextBlock("profile", f"[USER PROFILE]\n{user_ctx}", priority=60, min_tokens=64))
+        if self.session_first_input:
+            blocks.append(ContextBlock(
+                "anchor",
+                f"[SESSION ANCHOR] The first message Tudor sent this session was: '{self.session_first_input}'",
+                priority=40, min_tokens=32
+            ))
+
+        turns = list(self.short_term_memory)
+        for i, m in enumerate(turns):
+            role = "user" if m.startswith("User:") else "assistant"
+            # Older turns are worth less; the most recent exchange is kept but may be shortened
+            recent = i >= len(turns) - 2
+            blocks.append(ContextBlock(
+                f"history[{i}]", m.split(":", 1)[1].strip(), role=role,
+                priority=50 if recent else 20 + i, min_tokens=128 if recent else 0
+            ))
+
+        blocks.append(ContextBlock("time_vitals", f"{self.chronometer.get_time_context()}\n\n{vitals_text}", priority=70, min_tokens=32))
+        pending = gathered.get("tasks")
+        if pending and "No pending" not in pending:
+            blocks.append(ContextBlock("tasks", f"[PENDING TASKS]\n{pending}", priority=55, min_tokens=64))
         if episodic_context:
-            messages.append({
-                "role": "system",
-                "content": f"[PAST EPISODES - CONCLUDED SESSIONS - NOT current session]\n{episodic_context}"
-            })
-
+            blocks.append(ContextBlock(
+                "episodes", f"[PAST EPISODES - CONCLUDED SESSIONS - NOT current session]\n{episodic_context}",
+                priority=45, min_tokens=0
+            ))
         if long_term_context:
-            messages.append({
-                "role": "system",
-                "content": (
-                    f"[LONG-TERM MEMORY]\n{long_term_context}\n\n"
-                    "RULE-MEM-1 REMINDER: ONLY use facts listed above. Do NOT invent additional personal facts."
-                )
-            })
+            blocks.append(ContextBlock(
+                "long_term_memory",
+                f"[LONG-TERM MEMORY]\n{long_term_context}\n\n"
+                "RULE-MEM-1 REMINDER: ONLY use facts listed above. Do NOT invent additional personal facts.",
+                priority=80, min_tokens=128
+            ))
         else:
-            messages.append({
-                "role": "system",
-                "content": "[LONG-TERM MEMORY]\nEmpty. RULE-MEM-1: You have NO personal facts about the user. Do not invent any."
-            })
+            blocks.append(ContextBlock(
+                "long_term_memory",
+                "[LONG-TERM MEMORY]\nEmpty. RULE-MEM-1: You have NO personal facts about the user. Do not invent any.",
+                priority=PINNED
+            ))
 
-        for m in list(self.short_term_memory):
-            role = "user" if m.startswith("User:") else "assistant"
-            messages.append({"role": role, "content": m.split(":", 1)[1].strip()})
-
-        messages.append({"role": "user", "content": user_input})
+        # COMMAND turns carry the worker's [EXECUTION RESULT] here, which can be huge
+        blocks.append(ContextBlock("user", user_input, role="user", priority=90, min_tokens=512))
 
         if intent == "IMAGINE":
-            messages.append({
-                "role": "system",
-                "content": (
-                    "[IMAGINE MODE] Generate a creative, specific, vivid response. "
-                    "Do NOT say 'I have no record' in IMAGINE mode. "
-                    "Do NOT claim this connects to past conversations unless in your provided context. "
-                    "Be descriptive. Give a real answer."
-                )
-            })
+            blocks.append(ContextBlock(
+                "imagine_mode",
+                "[IMAGINE MODE] Generate a creative, specific, vivid response. "
+                "Do NOT say 'I have no record' in IMAGINE mode. "
+                "Do NOT claim this connects to past conversations unless in your provided context. "
+                "Be descriptive. Give a real answer.",
+                priority=PINNED
+            ))
+
+        messages = self.prompt_builder.build(blocks)
+        self.prompt_builder.log_report()
 
         vram.ensure_loaded("butler")
         full_response = ""
@@ -477,7 +527,7 @@ class LLMEngine:
         self.last_interaction = {"user": user_input, "atlas": full_response}
 
         if self._extract_thread is None or not self._extract_thread.is_alive():
-            self._extract_thread = threading.Thread(target=self._extract_facts_bg, args=(user_input,), daemon=True)
+            self._extract_thread = threading.Thread(target=self._extract_facts_bg, args=(user_input, intent_scores), daemon=True)
             self._extract_thread.start()
 
 
@@ -0,0 +1,177 @@
+"""
+Prompt Builder — keeps the butler prompt's prefix byte-stable across turns
+and inside a per-model token budget.
+
+Ollama reuses its KV cache for the longest prefix shared with the previous
+request, so anything that changes every turn (clock, vitals, retrieved
+memories, pending tasks) goes at the tail, after the conversation history.
+The layout is:
+
+    [stable]    system prompt + identity rules, user profile, session anchor
+    [history]   short-term conversation (append-only until the window rolls)
+    [volatile]  time/vitals, pending tasks, episodes, long-term memory
+    [user]      the current message
+
+Before the messages are emitted the ContextPacker checks the total against
+the model's budget and trims the lowest-priority blocks first.  After each
+build the builder reports how many prompt tokens were shared with the
+previous turn's prompt, i.e. how much prefill the server could skip.
+"""
+
+import threading
+from colorama import Fore
+from config import PROMPT_TOKEN_BUDGETS, PROMPT_TOKEN_BUDGET_DEFAULT
+
+# Per-message overhead of the chat template (role header + separators)
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+# Blocks at this priority are never trimmed (system prompt, identity rules)
+PINNED = 100
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local estimate (~4 characters per token for Llama-family vocabularies)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+class ContextBlock:
+    """
+    One message of the prompt.  Lower *priority* is trimmed first; a block
+    with ``min_tokens == 0`` may be dropped outright, otherwise it is cut
+    down to no less than ``min_tokens``.
+    """
+
+    __slots__ = ("name", "role", "content", "priority", "min_tokens")
+
+    def __init__(self, name: str, content: str, priority: int = 50, role: str = "system", min_tokens: int = 0):
+        self.name = name
+        self.role = role
+        self.content = content
+        self.priority = priority
+        self.min_tokens = min_tokens
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.content) + _MESSAGE_OVERHEAD_TOKENS
+
+
+class ContextPacker:
+    def __init__(self, budget: int):
+        self.budget = budget
+
+    @classmethod
+    def for_model(cls, model_name: str) -> "ContextPacker":
+        return cls(PROMPT_TOKEN_BUDGETS.get(model_name, PROMPT_TOKEN_BUDGET_DEFAULT))
+
+    def pack(self, blocks: list) -> tuple:
+        """Return (kept_blocks, report).  Block order is preserved."""
+        before = {id(b): b.tokens() for b in blocks}
+        total = sum(before.values())
+        over = total - self.budget
+        actions = {}
+
+        if over > 0:
+            # Lowest priority first; among equals, earliest (oldest history) first
+            order = sorted(
+                (i for i, b in enumerate(blocks) if b.priority < PINNED),
+                key=lambda i: (blocks[i].priority, i)
+            )
+            for i in order:
+                if over <= 0:
+                    break
+                block = blocks[i]
+                size = before[id(block)]
+                if block.min_tokens == 0:
+                    actions[id(block)] = "dropped"
+                    over -= size
+                    continue
+                target = max(block.min_tokens, size - _MESSAGE_OVERHEAD_TOKENS - over)
+                if target < size - _MESSAGE_OVERHEAD_TOKENS:
+                    block.content = _truncate(block.content, target)
+                    actions[id(block)] = "truncated"
+                    over -= size - block.tokens()
+
+        kept = [b for b in blocks if actions.get(id(b)) != "dropped"]
+        report = {
+            "budget": self.budget,
+            "tokens_before": total,
+            "tokens_after": sum(b.tokens() for b in kept),
+            "blocks": [
+                {
+                    "name": b.name,
+                    "tokens": before[id(b)],
+                    "kept": 0 if actions.get(id(b)) == "dropped" else b.tokens(),
+                    "action": actions.get(id(b), "kept"),
+                }
+                for b in blocks
+            ],
+        }
+        return kept, report
+
+
+class PromptBuilder:
+    def __init__(self, packer: ContextPacker = None):
+        self.packer = packer
+        self._lock = threading.Lock()
+        self._previous = []
+        self.last_report = {}
+
+    def build(self, blocks: list) -> list:
+        """Pack *blocks* (ContextBlock, in prompt order) into Ollama chat messages."""
+        pack_report = None
+        if self.packer:
+            blocks, pack_report = self.packer.pack(blocks)
+        messages = [{"role": b.role, "content": b.content} for b in blocks if b.content]
+
+        with self._lock:
+            self.last_report = self._prefix_report(messages)
+            if pack_report:
+                self.last_report["packing"] = pack_report
+            self._previous = messages
+        return messages
+
+    def _prefix_report(self, messages: list) -> dict:
+        total = sum(estimate_tokens(m["content"]) + _MESSAGE_OVERHEAD_TOKENS for m in messages)
+        reused = 0
+        for prev, cur in zip(self._previous, messages):
+            if prev == cur:
+                reused += estimate_tokens(cur["content"]) + _MESSAGE_OVERHEAD_TOKENS
+                continue
+            if prev["role"] == cur["role"]:
+                reused += _MESSAGE_OVERHEAD_TOKENS + estimate_tokens(_common_prefix(prev["content"], cur["content"]))
+            break
+        return {
+            "prompt_tokens": total,
+            "prefix_tokens_reused": reused,
+            "reuse_ratio": round(reused / total, 3) if total else 0.0,
+        }
+
+    def log_report(self):
+        r = self.last_report
+        if not r:
+            return
+        print(Fore.LIGHTBLACK_EX + f" [PROMPT] ~{r['prompt_tokens']} tokens, ~{r['prefix_tokens_reused']} unchanged prefix ({int(r['reuse_ratio'] * 100)}%)")
+        packing = r.get("packing")
+        if packing and packing["tokens_before"] > packing["budget"]:
+            trimmed = ", ".join(
+                f"{b['name']} {b['tokens']}->{b['kept']}" for b in packing["blocks"] if b["action"] != "kept"
+            )
+            print(Fore.YELLOW + f" [PROMPT] Over budget ({packing['tokens_before']}/{packing['budget']}), trimmed: {trimmed}")
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of *text* within roughly *max_tokens* tokens."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    marker = f"\n[... {estimate_tokens(text) - max_tokens} tokens trimmed ...]\n"
+    keep = max(0, max_chars - len(marker))
+    head = (keep * 2) // 3
+    return text[:head] + marker + text[len(text) - (keep - head):]
+
+
+def _common_prefix(a: str, b: str) -> str:
+    n = 0
+    limit = min(len(a), len(b))
+    while n < limit and a[n] == b[n]:
+        n += 1
+    return a[:n]
@@ -42,32 +42,14 @@ class Router:
         self.valid_intents = {"CHAT", "COMMAND", "MEMORY", "QUERY", "IMAGINE"}
 
     def route(self, user_input: str) -> str:
-        lower = user_input.lower()
-        tokens = set(re.findall(r'\b\w+\b', lower))
-
-        for phrase in _COMMAND_PHRASES:
-            if phrase in lower:
-                self.bus.publish("intent_COMMAND", user_input)
-                return "COMMAND"
-
-        if (_ACTION & tokens) and (_TARGET & tokens):
-            self.bus.publish("intent_COMMAND", user_input)
-            return "COMMAND"
-
-        for phrase in _MEMORY_PHRASES:
-            if phrase in lower:
-                self.bus.publish("intent_MEMORY", user_input)
-                return "MEMORY"
-
-        imagine_words = frozenset(["imagine","what if","suppose","hypothetically","brainstorm","could we","would happen"])
-        if imagine_words & tokens:
-            self.bus.publish("intent_IMAGINE", user_input)
-            return "IMAGINE"
+        intent = self.classify(user_input)
+        self.bus.publish(f"intent_{intent}", user_input)
+        return intent
 
-        words = lower.split()
-        if len(words) <= 8:
-            intent = "CHAT"
-            self.bus.publish(f"intent_{intent}", user_input)
+    def classify(self, user_input: str) -> str:
+        """Intent only, no bus side effects."""
+        intent = self.classify_rules(user_input)
+        if intent:
             return intent
 
         prompt = (
@@ -91,5 +73,29 @@ class Router:
         except:
             intent = "CHAT"
 
-        self.bus.publish(f"intent_{intent}", user_input)
-        return intent
\ No newline at end of file
+        return intent
+
+    def classify_rules(self, user_input: str):
+        """Keyword rules only: the intent, or None when it takes the LLM (safe to run speculatively)."""
+        lower = user_input.lower()
+        tokens = set(re.findall(r'\b\w+\b', lower))
+
+        for phrase in _COMMAND_PHRASES:
+            if phrase in lower:
+                return "COMMAND"
+
+        if (_ACTION & tokens) and (_TARGET & tokens):
+            return "COMMAND"
+
+        for phrase in _MEMORY_PHRASES:
+            if phrase in lower:
+                return "MEMORY"
+
+        imagine_words = frozenset(["imagine","what if","suppose","hypothetically","brainstorm","could we","would happen"])
+        if imagine_words & tokens:
+            return "IMAGINE"
+
+        words = lower.split()
+        if len(words) <= 8:
+            return "CHAT"
+        return None
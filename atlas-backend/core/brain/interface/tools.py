@@ -1,9 +1,13 @@
+import bisect
 import os
 import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from colorama import Fore
 import docker
-from config import SANDBOX_PATH, ARCHITECT_LOCAL_MODEL, BASH_TIMEOUT, OLLAMA_KEEP_ALIVE, DOCKER_IMAGE, CONTAINER_NAME
+from config import SANDBOX_PATH, ARCHITECT_LOCAL_MODEL, BASH_TIMEOUT, OLLAMA_KEEP_ALIVE, DOCKER_IMAGE, CONTAINER_NAME, TOOL_TIMEOUTS, WORKER_TOOL_PARALLELISM
 from core.brain.interface.vram_manager import vram
 
 try:
@@ -12,6 +16,15 @@ except docker.errors.DockerException:
     print(Fore.RED + " [SYSTEM] WARNING: Docker is not running. Sandbox is offline.")
     docker_client = None
 
+# Latency histogram bucket upper bounds (ms) for ToolRegistry.stats()
+_LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Runs handlers that have a timeout; a timed-out call keeps its thread until it returns
+_tool_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+# Concurrent I/O-bound tool calls (web, URL reads, sandbox, cloud) across all workers and plan steps
+_io_slots = threading.BoundedSemaphore(WORKER_TOOL_PARALLELISM)
+
 def get_or_create_sandbox():
     """Ensures the worker container is running and the shared volume exists."""
     if not docker_client: return None
@@ -35,162 +48,309 @@ def get_or_create_sandbox():
             network_mode="bridge" 
         )
 
+def extract_tool_call(llm_output: str) -> dict:
+    """
+    A robust, forgiving extractor for LLM XML tool calls.
+    Handles capitalization, hallucinated attributes, and line breaks.
+    """
+    result = {"tool": None, "parameters": {}}
+    
+    tool_match = re.search(r'<tool\b[^>]*>(.*?)</tool>', llm_output, re.IGNORECASE | re.DOTALL)
+    
+    if tool_match:
+        attr_match = re.search(r'<tool\b[^>]*name=["\']([^"\']+)["\']', llm_output, re.IGNORECASE)
+        if attr_match:
+            result["tool"] = attr_match.group(1).strip()
+        else:
+            result["tool"] = tool_match.group(1).strip()
+            
+    param_matches = re.finditer(r'<([a-zA-Z0-9_]+)\b[^>]*>(.*?)</\1>', llm_output, re.IGNORECASE | re.DOTALL)
+    for match in param_matches:
+        tag_name = match.group(1).lower()
+        tag_content = match.group(2).strip()
+        
+        if tag_name != 'tool':
+            result["parameters"][tag_name] = tag_content
+
+    return result
+
+
+_TOOL_OPEN = re.compile(r'<tool\b', re.IGNORECASE)
+_TOOL_BLOCK = re.compile(r'<tool\b([^>]*)>(.*?)</tool>', re.IGNORECASE | re.DOTALL)
+_TOOL_NAME_ATTR = re.compile(r'name=["\']([^"\']+)["\']', re.IGNORECASE)
+_CLOSED_TAG = re.compile(r'<([a-zA-Z0-9_]+)\b[^>]*>(.*?)</\1>', re.IGNORECASE | re.DOTALL)
+
+
+class ToolCallStream:
+    """
+    Incremental parser for one streamed tool call.  ``feed`` returns
+    "complete" once the first tool block is closed (the tool tag plus every
+    parameter it takes, or the required ones followed by anything that is not
+    another of its parameters), "malformed" as soon as the output can no
+    longer become a valid call, and None while more tokens are needed.
+    ``text`` is the output up to the end of the call.
+    """
+
+    def __init__(self, specs: dict, max_preamble: int = 400):
+        self._specs = specs
+        self.max_preamble = max_preamble
+        self.buffer = ""
+        self.state = None
+        self.reason = ""
+        self._end = None
+        self._at_tail = False    # required parameters closed, waiting to see what follows
+
+    @property
+    def text(self) -> str:
+        return self.buffer[:self._end] if self._end is not None else self.buffer
+
+    def feed(self, chunk: str):
+        if self.state or not chunk:
+            return self.state
+        self.buffer += chunk
+        # Nothing can have closed unless a tag ended in this chunk
+        if ">" not in chunk and not self._at_tail and len(self.buffer) <= self.max_preamble:
+            return None
+        return self._scan()
+
+    def _finish(self, state: str, reason: str = "", end: int = None):
+        self.state, self.reason, self._end = state, reason, end
+        return state
+
+    def _scan(self):
+        buf = self.buffer
+        opened = _TOOL_OPEN.search(buf)
+        if not opened:
+            if len(buf) > self.max_preamble:
+                return self._finish("malformed", "no <tool> tag")
+            return None
+
+        block = _TOOL_BLOCK.search(buf)
+        inner = _TOOL_OPEN.search(buf, opened.end(), block.end() if block else len(buf))
+        if inner:
+            # Another call started before the first tool tag was closed
+            return self._finish("malformed", "unclosed <tool> tag", inner.start())
+        if not block:
+            return None
+
+        attr = _TOOL_NAME_ATTR.search(block.group(1))
+        name = (attr.group(1) if attr else block.group(2)).strip().lower()
+        spec = self._specs.get(name)
+        if spec is None:
+            return self._finish("malformed", f"unknown tool '{name}'", block.end())
+
+        # Parameters may come before the tool tag
+        closed = {m.group(1).lower() for m in _CLOSED_TAG.finditer(buf, 0, opened.start())}
+        last_end = pos = block.end()
+        params = spec.required + spec.optional
+        param_open = re.compile(r'<(%s)\b[^>]*>' % "|".join(params), re.IGNORECASE) if params else None
+        while True:
+            param = param_open.search(buf, pos) if param_open else None
+            second = _TOOL_OPEN.search(buf, pos)
+            if param and not (second and second.start() < param.start()):
+                # Anything inside a parameter, <tool> included, is its value
+                tag = param.group(1).lower()
+                close = re.compile(r'</%s\s*>' % tag, re.IGNORECASE).search(buf, param.end())
+                if not close:
+                    return None
+                closed.add(tag)
+                last_end = pos = close.end()
+                continue
+            if second:
+                # A second tool block means the first one is over, whatever state it is in
+                return self._finish("complete", "second tool call", last_end)
+            break
+        if any(p not in closed for p in spec.required):
+            return None
+        remaining = [f"<{p}" for p in spec.optional if p not in closed]
+        if not remaining:
+            return self._finish("complete", end=last_end)
+
+        self._at_tail = True
+        tail = buf[last_end:].lstrip().lower()
+        if not tail or any(tag.startswith(tail) or tail.startswith(tag) for tag in remaining):
+            return None       # an optional parameter may still follow
+        return self._finish("complete", end=last_end)
+
+
+class ToolSpec:
+    """
+    One worker tool.  *handler* is called with the parsed tag values as
+    keyword arguments; every *required* tag is guaranteed to be present,
+    *optional* ones only when the model sent them.  *timeout* (seconds)
+    bounds the call; None runs it inline.  *kind* is "io" for network and
+    sandbox calls (at most WORKER_TOOL_PARALLELISM at once), "model" for
+    calls that generate locally (serialized by vram.slot inside the handler)
+    or "local".  *usage* is the numbered entry shown to the model in the
+    tool schema.  A spec with no handler is listed
+    in the schema but handled by the caller (finish, show_payload).
+    """
+
+    __slots__ = ("name", "handler", "required", "optional", "timeout", "kind", "usage")
+
+    def __init__(self, name: str, handler, required: tuple = (), optional: tuple = (), timeout: float = None,
+                 kind: str = "local", usage: str = ""):
+        self.name = name
+        self.handler = handler
+        self.required = tuple(required)
+        self.optional = tuple(optional)
+        self.timeout = timeout
+        self.kind = kind
+        self.usage = usage
+
+
+class ToolStats:
+    """Call count, error count and a latency histogram for one tool."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.buckets = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms: float, is_error: bool):
+        self.calls += 1
+        self.errors += int(is_error)
+        self.total_ms += elapsed_ms
+        self.buckets[bisect.bisect_left(_LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def as_dict(self) -> dict:
+        labels = [f"<={b}ms" for b in _LATENCY_BUCKETS_MS] + [f">{_LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 3) if self.calls else 0.0,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            "latency_histogram": dict(zip(labels, self.buckets)),
+        }
+
+
 class ToolRegistry:
     def __init__(self, sandbox_path=SANDBOX_PATH):
         self.sandbox_path = sandbox_path
+        self._memory = None   # lazy MemorySystem, reused across remember calls
+        self._specs = {}      # name -> ToolSpec, in schema order
+        self._stats = {}      # name -> ToolStats
+        self._stats_lock = threading.Lock()
         os.makedirs(self.sandbox_path, exist_ok=True)
+        self._register_builtin_tools()
+
+    def _register_builtin_tools(self):
+        t = TOOL_TIMEOUTS.get
+        for spec in (
+            ToolSpec("read_file", self._read_file, ("filepath",), timeout=t("read_file"),
+                     usage="Read a file\n<tool>read_file</tool>\n<filepath>filename.txt</filepath>"),
+            ToolSpec("write_file", self._write_file, ("filepath", "content"), timeout=t("write_file"),
+                     usage="Write to a file\n<tool>write_file</tool>\n<filepath>filename.txt</filepath>\n<content>exact content here</content>"),
+            ToolSpec("execute_bash", self._execute_bash, ("command",), timeout=t("execute_bash"), kind="io",
+                     usage="Execute a terminal command\n<tool>execute_bash</tool>\n<command>dir</command>"),
+            ToolSpec("delete_file", self._delete_file, ("filepath",), timeout=t("delete_file"),
+                     usage="Delete a file\n<tool>delete_file</tool>\n<filepath>filename.txt</filepath>"),
+            ToolSpec("finish", None, ("message",),
+                     usage="Finish the task\n<tool>finish</tool>\n<message>Specific summary: what was done, filenames created, results found.</message>"),
+            ToolSpec("ask_local_architect", self._ask_local_architect, ("prompt",), timeout=t("ask_local_architect"), kind="model",
+                     usage="Consult the Local Architect\n<tool>ask_local_architect</tool>\n<prompt>Write Python code for X. Include all constraints. I will handle file writing.</prompt>"),
+            ToolSpec("ask_cloud_architect", self._ask_cloud_architect, ("prompt",), timeout=t("ask_cloud_architect"), kind="io",
+                     usage="Consult the Cloud Architect (Gemini)\n<tool>ask_cloud_architect</tool>\n<prompt>Write a multi-file C++ project. Separate files with // --- FILENAME: x.cpp ---</prompt>"),
+            ToolSpec("web_search", self._web_search, ("query",), timeout=t("web_search"), kind="io",
+                     usage="Search the Web\n<tool>web_search</tool>\n<query>How to use FastAPI in Python</query>"),
+            ToolSpec("list_directory", self._list_directory, optional=("path",), timeout=t("list_directory"),
+                     usage="List Directory Contents\n<tool>list_directory</tool>\n<path>.</path>"),
+            ToolSpec("patch_file", self._patch_file, ("filepath", "search", "replace"), timeout=t("patch_file"),
+                     usage="Patch an existing file (Search and Replace)\n<tool>patch_file</tool>\n<filepath>script.py</filepath>\n<search>exact existing text</search>\n<replace>new text</replace>"),
+            ToolSpec("remember", self._remember, ("fact",), timeout=t("remember"),
+                     usage="Save a fact to long-term memory\n<tool>remember</tool>\n<fact>The user prefers tabs over spaces in Python.</fact>"),
+            ToolSpec("schedule_task", self._schedule_task, ("task",), ("delay_minutes",), timeout=t("schedule_task"),
+                     usage="Schedule a task for later\n<tool>schedule_task</tool>\n<task>Remind user to check the server logs.</task>\n<delay_minutes>30</delay_minutes>"),
+            ToolSpec("read_url", self._read_url, ("url",), timeout=t("read_url"), kind="io",
+                     usage="Read a URL / webpage\n<tool>read_url</tool>\n<url>https://docs.python.org/3/library/asyncio.html</url>"),
+            ToolSpec("python_repl", self._python_repl, ("code",), timeout=t("python_repl"),
+                     usage="Execute Python expression directly\n<tool>python_repl</tool>\n<code>sum(range(1, 101))</code>"),
+            ToolSpec("show_payload", None, ("ref",),
+                     usage="Show an earlier tool result again ([payload #n] markers)\n<tool>show_payload</tool>\n<ref>2</ref>"),
+        ):
+            self.register(spec)
+
+    # ------------------------------------------------------------------
+    def register(self, spec: ToolSpec):
+        """Add or replace a tool.  Workers built afterwards see it in their schema."""
+        with self._stats_lock:
+            self._specs[spec.name] = spec
+            self._stats.setdefault(spec.name, ToolStats())
+
+    def unregister(self, name: str):
+        with self._stats_lock:
+            self._specs.pop(name, None)
+
+    def spec(self, name: str):
+        return self._specs.get(name)
+
+    @property
+    def tool_schema(self) -> str:
+        entries = [f"{i}. {spec.usage}" for i, spec in enumerate(self._specs.values(), 1) if spec.usage]
+        return (
+            "\nAVAILABLE TOOLS:\n\n" + "\n\n".join(entries) +
+            "\n\nINSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commentary.\n"
+        )
 
-        self.tool_schema = """
-AVAILABLE TOOLS:
-
-1. Read a file
-<tool>read_file</tool>
-<filepath>filename.txt</filepath>
-
-2. Write to a file
-<tool>write_file</tool>
-<filepath>filename.txt</filepath>
-<content>exact content here</content>
-
-3. Execute a terminal command
-<tool>execute_bash</tool>
-<command>dir</command>
-
-4. Delete a file
-<tool>delete_file</tool>
-<filepath>filename.txt</filepath>
-
-5. Finish the task
-<tool>finish</tool>
-<message>Specific summary: what was done, filenames created, results found.</message>
-
-6. Consult the Local Architect
-<tool>ask_local_architect</tool>
-<prompt>Write Python code for X. Include all constraints. I will handle file writing.</prompt>
-
-7. Consult the Cloud Architect (Gemini)
-<tool>ask_cloud_architect</tool>
-<prompt>Write a multi-file C++ project. Separate files with // --- FILENAME: x.cpp ---</prompt>
-
-8. Search the Web
-<tool>web_search</tool>
-<query>How to use FastAPI in Python</query>
-
-9. List Directory Contents
-<tool>list_directory</tool>
-<path>.</path>
-
-10. Patch an existing file (Search and Replace)
-<tool>patch_file</tool>
-<filepath>script.py</filepath>
-<search>exact existing text</search>
-<replace>new text</replace>
-
-11. Save a fact to long-term memory
-<tool>remember</tool>
-<fact>The user prefers tabs over spaces in Python.</fact>
-
-12. Schedule a task for later
-<tool>schedule_task</tool>
-<task>Remind user to check the server logs.</task>
-<delay_minutes>30</delay_minutes>
-
-13. Read a URL / webpage
-<tool>read_url</tool>
-<url>https://docs.python.org/3/library/asyncio.html</url>
-
-14. Execute Python expression directly
-<tool>python_repl</tool>
-<code>sum(range(1, 101))</code>
+    def stream_parser(self) -> ToolCallStream:
+        return ToolCallStream(self._specs)
 
-INSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commentary.
-"""
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {name: s.as_dict() for name, s in self._stats.items() if s.calls}
 
+    # ------------------------------------------------------------------
     def execute_tool(self, xml_string: str) -> str:
+        extracted = extract_tool_call(xml_string)
+        if not extracted["tool"]:
+            return "[ERROR] No valid <tool> tag found."
+        return self.execute_call(extracted["tool"], extracted["parameters"])
+
+    def execute_call(self, action: str, params: dict) -> str:
+        """Run one already-parsed tool call (see extract_tool_call)."""
+        action = action.strip().lower()
+        spec = self._specs.get(action)
+        if spec is None or spec.handler is None:
+            return f"[ERROR] Unknown tool: '{action}'"
+        missing = [p for p in spec.required if params.get(p) is None]
+        kwargs = {p: params[p] for p in spec.required + spec.optional if params.get(p) is not None}
+
+        started = time.perf_counter()
         try:
-            tool_match = re.search(r'<tool>(.*?)</tool>', xml_string, re.IGNORECASE | re.DOTALL)
-            if not tool_match:
-                return "[ERROR] No valid <tool> tag found."
-            action = tool_match.group(1).strip().lower()
-
-            if action == "read_file":
-                fp = re.search(r'<filepath>(.*?)</filepath>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not fp: return "[ERROR] Missing <filepath>."
-                return self._read_file(fp.group(1).strip())
-
-            elif action == "write_file":
-                fp = re.search(r'<filepath>(.*?)</filepath>', xml_string, re.IGNORECASE | re.DOTALL)
-                ct = re.search(r'<content>(.*?)</content>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not fp or not ct: return "[ERROR] Missing <filepath> or <content>."
-                raw = ct.group(1).strip()
-                if raw.startswith("<![CDATA[") and raw.endswith("]]>"):
-                    raw = raw[9:-3].strip()
-                return self._write_file(fp.group(1).strip(), raw)
-
-            elif action == "delete_file":
-                fp = re.search(r'<filepath>(.*?)</filepath>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not fp: return "[ERROR] Missing <filepath>."
-                return self._delete_file(fp.group(1).strip())
-
-            elif action == "execute_bash":
-                cmd = re.search(r'<command>(.*?)</command>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not cmd: return "[ERROR] Missing <command>."
-                return self._execute_bash(cmd.group(1).strip())
-
-            elif action == "ask_local_architect":
-                pm = re.search(r'<prompt>(.*?)</prompt>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not pm: return "[ERROR] Missing <prompt>."
-                return self._ask_local_architect(pm.group(1).strip())
-
-            elif action == "ask_cloud_architect":
-                pm = re.search(r'<prompt>(.*?)</prompt>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not pm: return "[ERROR] Missing <prompt>."
-                return self._ask_cloud_architect(pm.group(1).strip())
-
-            elif action == "web_search":
-                qm = re.search(r'<query>(.*?)</query>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not qm: return "[ERROR] Missing <query>."
-                return self._web_search(qm.group(1).strip())
-
-            elif action == "list_directory":
-                pm = re.search(r'<path>(.*?)</path>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not pm: return "[ERROR] Missing <path>."
-                return self._list_directory(pm.group(1).strip())
-
-            elif action == "patch_file":
-                fp = re.search(r'<filepath>(.*?)</filepath>', xml_string, re.IGNORECASE | re.DOTALL)
-                st = re.search(r'<search>(.*?)</search>', xml_string, re.IGNORECASE | re.DOTALL)
-                rt = re.search(r'<replace>(.*?)</replace>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not fp or not st or not rt: return "[ERROR] Missing filepath, search, or replace."
-                return self._patch_file(fp.group(1).strip(), st.group(1), rt.group(1))
-
-            elif action == "remember":
-                fm = re.search(r'<fact>(.*?)</fact>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not fm: return "[ERROR] Missing <fact>."
-                return self._remember(fm.group(1).strip())
-
-            elif action == "schedule_task":
-                tm = re.search(r'<task>(.*?)</task>', xml_string, re.IGNORECASE | re.DOTALL)
-                dm = re.search(r'<delay_minutes>(.*?)</delay_minutes>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not tm: return "[ERROR] Missing <task>."
-                delay = int(dm.group(1).strip()) * 60 if dm else 0
-                return self._schedule_task(tm.group(1).strip(), delay)
-
-            elif action == "read_url":
-                um = re.search(r'<url>(.*?)</url>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not um: return "[ERROR] Missing <url>."
-                return self._read_url(um.group(1).strip())
-
-            elif action == "python_repl":
-                cm = re.search(r'<code>(.*?)</code>', xml_string, re.IGNORECASE | re.DOTALL)
-                if not cm: return "[ERROR] Missing <code>."
-                return self._python_repl(cm.group(1).strip())
-
+            if missing:
+                result = f"[ERROR] Missing {', '.join(f'<{p}>' for p in missing)}."
             else:
-                return f"[ERROR] Unknown tool: '{action}'"
-
+                result = self._invoke(spec, kwargs)
         except Exception as e:
-            return f"[ERROR] Tool execution failed: {e}"
+            result = f"[ERROR] Tool execution failed: {e}"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._stats_lock:
+            self._stats[action].record(elapsed_ms, result.startswith(("[ERROR]", "[CRITICAL ERROR]")))
+        return result
+
+    def _invoke(self, spec: ToolSpec, kwargs: dict) -> str:
+        io = spec.kind == "io"
+        deadline = time.monotonic() + spec.timeout if spec.timeout else None
+        if io and not _io_slots.acquire(timeout=spec.timeout or -1):
+            # Waiting for a slot counts against the deadline too
+            return f"[ERROR] {spec.name} timed out after {spec.timeout:g}s waiting for a free I/O slot."
+        if not spec.timeout:
+            try:
+                return spec.handler(**kwargs)
+            finally:
+                if io:
+                    _io_slots.release()
+        future = _tool_pool.submit(spec.handler, **kwargs)
+        if io:
+            # Released when the handler really finishes, even after a timeout
+            future.add_done_callback(lambda _: _io_slots.release())
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            # The handler thread cannot be interrupted; it finishes in the background
+            return f"[ERROR] {spec.name} timed out after {spec.timeout:g}s."
 
     def _get_safe_path(self, filename: str) -> str:
         safe = os.path.abspath(os.path.join(self.sandbox_path, filename))
@@ -207,6 +367,8 @@ INSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commenta
             return f"[ERROR] Read failed: {e}"
 
     def _write_file(self, filepath: str, content: str) -> str:
+        if content.startswith("<![CDATA[") and content.endswith("]]>"):
+            content = content[9:-3].strip()
         try:
             target = self._get_safe_path(filepath)
             os.makedirs(os.path.dirname(target), exist_ok=True)
@@ -235,13 +397,17 @@ INSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commenta
             return "[ERROR] Docker sandbox is unavailable. Please start Docker Desktop."
             
         try:
+            # coreutils timeout kills the command inside the container (SIGKILL 2 s after SIGTERM),
+            # so a hung command cannot outlive its deadline or hold an I/O slot
             exit_code, output = container.exec_run(
-                ["/bin/sh", "-c", command], 
+                ["timeout", "-k", "2", str(BASH_TIMEOUT), "/bin/sh", "-c", command],
                 workdir="/workspace"
             )
             
             result_str = output.decode('utf-8', errors='replace').strip()
             
+            if exit_code in (124, 137):
+                return f"[ERROR] Command timed out after {BASH_TIMEOUT}s and was stopped.\nOutput:\n{result_str}"
             if exit_code != 0:
                 return f"[ERROR] Command failed with exit code {exit_code}.\nOutput:\n{result_str}"
                 
@@ -264,13 +430,13 @@ INSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commenta
             f"REQUEST: {prompt}\n"
         )
         try:
-            vram.ensure_loaded("architect")
-            code = ollama.generate(
-                model=ARCHITECT_LOCAL_MODEL, prompt=arch_prompt,
-                keep_alive=vram.get_keep_alive("architect"),
-            )['response'].strip()
-            # Immediately release the heavy model so the butler can reload
-            vram.release("architect")
+            with vram.slot("architect"):
+                code = ollama.generate(
+                    model=ARCHITECT_LOCAL_MODEL, prompt=arch_prompt,
+                    keep_alive=vram.get_keep_alive("architect"),
+                )['response'].strip()
+                # Immediately release the heavy model so the butler can reload
+                vram.release("architect")
 
             refusals = ["I'm sorry", "I cannot", "I apologize", "As an AI"]
             if any(code.startswith(r) for r in refusals):
@@ -317,7 +483,7 @@ INSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commenta
         except Exception as e:
             return f"[ERROR] Search failed: {e}"
 
-    def _list_directory(self, path: str) -> str:
+    def _list_directory(self, path: str = ".") -> str:
         try:
             safe = self._get_safe_path(path)
             if not os.path.exists(safe):
@@ -338,7 +504,8 @@ INSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commenta
         except Exception as e:
             return f"[ERROR] List failed: {e}"
 
-    def _patch_file(self, filepath: str, search_text: str, replace_text: str) -> str:
+    def _patch_file(self, filepath: str, search: str, replace: str) -> str:
+        search_text, replace_text = search, replace
         try:
             target = self._get_safe_path(filepath)
             if not os.path.exists(target):
@@ -359,17 +526,19 @@ INSTRUCTIONS: Output ONLY ONE XML tool block at a time. No markdown. No commenta
 
     def _remember(self, fact: str) -> str:
         try:
-            from core.brain.cognition.memory import MemorySystem
-            mem = MemorySystem()
-            saved = mem.save_memory(fact, importance=7.0, tags=["worker_saved"])
+            if self._memory is None:
+                from core.brain.cognition.memory import MemorySystem
+                self._memory = MemorySystem()
+            saved = self._memory.save_memory(fact, importance=7.0, tags=["worker_saved"])
             if saved:
                 return f"[SUCCESS] Committed to long-term memory: '{fact[:80]}'"
             return "[SUCCESS] Similar fact already in memory."
         except Exception as e:
             return f"[ERROR] Memory save failed: {e}"
 
-    def _schedule_task(self, task: str, delay_seconds: int = 0) -> str:
+    def _schedule_task(self, task: str, delay_minutes: str = None) -> str:
         try:
+            delay_seconds = int(delay_minutes) * 60 if delay_minutes else 0
             from core.brain.cognition.task_queue import TaskQueue
             from core.brain.interface.bus import EventBus
             tq = TaskQueue(EventBus())
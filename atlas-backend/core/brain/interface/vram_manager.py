@@ -10,6 +10,7 @@ it is routed to the cloud API (Gemini) by default.
 """
 
 import threading
+from contextlib import contextmanager
 import ollama as _ollama
 from colorama import Fore
 
@@ -34,6 +35,7 @@ class VRAMManager:
                     cls._instance = super().__new__(cls)
                     cls._instance._active_model = None
                     cls._instance._model_map = {}   # role -> model_name
+                    cls._instance._slot_lock = threading.RLock()   # held while a model is loaded or generating
         return cls._instance
 
     # ------------------------------------------------------------------
@@ -50,36 +52,54 @@ class VRAMManager:
         model = self._model_map.get(role)
         if not model:
             return
-
         if self._active_model == model:
-            return                       # already hot — nothing to do
+            return                           # already hot — never wait behind a slot holder's generation
 
-        # Evict the previous model
-        if self._active_model:
-            self._evict(self._active_model)
+        with self._slot_lock:
+            if self._active_model == model:
+                return                       # loaded by another thread while we waited
+
+            # Evict the previous model
+            if self._active_model:
+                self._evict(self._active_model)
+
+            # Warm the requested model with a single-token generate
+            try:
+                print(Fore.LIGHTBLACK_EX + f" [VRAM] Loading {role} ({model})...")
+                _ollama.generate(
+                    model=model,
+                    prompt=".",
+                    keep_alive=_KEEP_ALIVE.get(role, "5m"),
+                    options={"num_predict": 1},
+                )
+                self._active_model = model
+                print(Fore.LIGHTBLACK_EX + f" [VRAM] {role} ({model}) is now active.")
+            except Exception as e:
+                print(Fore.RED + f" [VRAM] Failed to load {role} ({model}): {e}")
 
-        # Warm the requested model with a single-token generate
-        try:
-            print(Fore.LIGHTBLACK_EX + f" [VRAM] Loading {role} ({model})...")
-            _ollama.generate(
-                model=model,
-                prompt=".",
-                keep_alive=_KEEP_ALIVE.get(role, "5m"),
-                options={"num_predict": 1},
-            )
-            self._active_model = model
-            print(Fore.LIGHTBLACK_EX + f" [VRAM] {role} ({model}) is now active.")
-        except Exception as e:
-            print(Fore.RED + f" [VRAM] Failed to load {role} ({model}): {e}")
+    # ------------------------------------------------------------------
+    @contextmanager
+    def slot(self, role: str):
+        """
+        Hold the model slot for one generation.  *role*'s model is loaded and
+        cannot be evicted by another thread until the block exits, so
+        concurrent model-bound work (e.g. parallel plan steps) runs one
+        generation at a time.  Callers that find their model already hot in
+        ensure_loaded do not wait for the slot.
+        """
+        with self._slot_lock:
+            self.ensure_loaded(role)
+            yield
 
     # ------------------------------------------------------------------
     def release(self, role: str):
         """Immediately evict a model (e.g. after an architect call)."""
         model = self._model_map.get(role)
         if model:
-            self._evict(model)
-            if self._active_model == model:
-                self._active_model = None
+            with self._slot_lock:
+                self._evict(model)
+                if self._active_model == model:
+                    self._active_model = None
 
     # ------------------------------------------------------------------
     def get_keep_alive(self, role: str):
@@ -1,15 +1,20 @@
 import re
+import time
 import ollama
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from colorama import Fore
-from core.brain.interface.tools import ToolRegistry
-from config import WORKER_MODEL, WORKER_MAX_STEPS
+from core.brain.interface.tools import ToolRegistry, extract_tool_call  # extract_tool_call re-exported for callers
+from config import WORKER_MODEL, WORKER_MAX_STEPS, WORKER_STREAMING, WORKER_PLAN_PARALLELISM
+from core.brain.cognition.executive import linear_plan
 from core.brain.interface.vram_manager import vram
+from core.brain.interface.worker_context import WorkerContext
 
 
 
 class WorkerNode:
-    def __init__(self, model_name=WORKER_MODEL, on_step_done=None):
+    def __init__(self, model_name=WORKER_MODEL, on_step_done=None, streaming=WORKER_STREAMING):
         self.model_name = model_name
+        self.streaming = streaming
         self.tools = ToolRegistry()
         self.on_step_done = on_step_done   # callable(step_index, action, result) | None
         vram.register("worker", self.model_name)
@@ -43,16 +48,44 @@ class WorkerNode:
             stripped = '\n'.join(cleaned).strip()
         return stripped
 
+    def _generate(self, messages: list) -> str:
+        """
+        One worker turn.  When streaming, tokens go through the registry's
+        incremental tool-call parser and generation is cancelled as soon as
+        the first tool block closes or the output turns out to be malformed.
+        The VRAM slot is held for the turn, so concurrent plan steps take
+        turns on the model while their tool calls overlap.
+        """
+        options = {"temperature": 0.0, "top_p": 0.05, "num_predict": 1200}
+        keep_alive = vram.get_keep_alive("worker")
+        with vram.slot("worker"):
+            if not self.streaming:
+                response = ollama.chat(model=self.model_name, messages=messages, keep_alive=keep_alive, options=options)
+                return response['message']['content']
+
+            parser = self.tools.stream_parser()
+            stream = ollama.chat(model=self.model_name, messages=messages, keep_alive=keep_alive, options=options, stream=True)
+            try:
+                for chunk in stream:
+                    if parser.feed(chunk['message']['content']):
+                        break
+            finally:
+                # Closing the stream drops the connection, which stops generation server-side
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+        if parser.state == "malformed":
+            print(Fore.RED + f" [WORKER] Malformed output ({parser.reason}), stopped after {len(parser.buffer)} chars.")
+        elif parser.state and len(parser.text) < len(parser.buffer):
+            print(Fore.LIGHTBLACK_EX + f" [WORKER] Tool call closed; cancelled generation ({len(parser.buffer) - len(parser.text)} trailing chars dropped).")
+        return parser.text
+
     def execute_task(self, user_task: str, context: str = "") -> str:
         print(Fore.LIGHTBLACK_EX + f" [WORKER] Starting: '{user_task[:80]}'")
-        vram.ensure_loaded("worker")
         task_content = f"Task: {user_task}"
         if context:
             task_content += f"\n\n[CONTEXT FROM PREVIOUS STEP]:\n{context}"
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"{task_content}\n\nOutput your first XML tool call now."}
-        ]
+        ctx = WorkerContext.for_model(self.model_name, self.system_prompt, f"{task_content}\n\nOutput your first XML tool call now.")
         execution_log = []
         raw_data_memory = []
         consecutive_errors = 0
@@ -60,30 +93,22 @@ class WorkerNode:
         for step in range(WORKER_MAX_STEPS):
             print(Fore.LIGHTBLACK_EX + f" [WORKER] Step {step + 1}/{WORKER_MAX_STEPS}")
             try:
-                response = ollama.chat(
-                    model=self.model_name,
-                    messages=messages,
-                    keep_alive=vram.get_keep_alive("worker"),
-                    options={"temperature": 0.0, "top_p": 0.05, "num_predict": 1200}
-                )
-                xml_call = self._strip_markdown(response['message']['content'])
+                xml_call = self._strip_markdown(self._generate(ctx.messages()))
                 print(Fore.CYAN + f" [WORKER ACTION]: {xml_call[:150]}")
 
                 extracted = extract_tool_call(xml_call)
                 action = extracted.get("tool")
 
                 if not action:
-                    messages.append({"role": "assistant", "content": xml_call})
-                    messages.append({"role": "user", "content": "[SYSTEM] No <tool> tag found. You must output XML only. Example:\n<tool>write_file</tool>\n<filepath>hello.py</filepath>\n<content>print('hello')</content>"})
+                    ctx.add_turn(xml_call, "[SYSTEM] No <tool> tag found. You must output XML only. Example:\n<tool>write_file</tool>\n<filepath>hello.py</filepath>\n<content>print('hello')</content>")
                     continue
 
                 action = action.strip().lower()
 
                 if action == "finish":
-                    last_user_msg = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
-                    if execution_log and "[ERROR]" in last_user_msg and consecutive_errors > 0:
-                        messages.append({"role": "assistant", "content": xml_call})
-                        messages.append({"role": "user", "content": "[SYSTEM] Cannot finish after an unresolved [ERROR]. Fix the error first."})
+                    if execution_log and "[ERROR]" in ctx.last_feedback and consecutive_errors > 0:
+                        ctx.add_turn(xml_call, "[SYSTEM] Cannot finish after an unresolved [ERROR]. Fix the error first.",
+                                     action=action, params=extracted["parameters"])
                         continue
                     
                     final_msg = extracted["parameters"].get("message", "Task complete.")
@@ -94,26 +119,23 @@ class WorkerNode:
                         result += f"\n\n[RAW DATA]:\n" + "\n\n".join(raw_data_memory)
                     return result
 
-                if action == "write_file":
-                    raw_content = extracted["parameters"].get("content")
-                    if raw_content:
-                        cleaned_content = re.sub(r'^//\s*---\s*FILENAME:.*?---\s*\n?', '', raw_content, flags=re.MULTILINE).strip()
-                        if cleaned_content != raw_content.strip():
-                            xml_call = xml_call.replace(raw_content, f"\n{cleaned_content}\n")
-
-                result = self.tools.execute_tool(xml_call)
-
-                if action == "write_file":
-                    content_match = re.search(r'<content>(.*?)</content>', xml_call, re.IGNORECASE | re.DOTALL)
-                    if content_match:
-                        raw_content = content_match.group(1)
-                        cleaned_content = re.sub(r'^//\s*---\s*FILENAME:.*?---\s*\n?', '', raw_content, flags=re.MULTILINE).strip()
-                        if cleaned_content != raw_content.strip():
-                            xml_call = xml_call.replace(content_match.group(1), f"\n{cleaned_content}\n")
-
-                result = self.tools.execute_tool(xml_call)
+                params = extracted["parameters"]
+                if action == "write_file" and params.get("content"):
+                    raw_content = params["content"]
+                    cleaned_content = re.sub(r'^//\s*---\s*FILENAME:.*?---\s*\n?', '', raw_content, flags=re.MULTILINE).strip()
+                    if cleaned_content != raw_content:
+                        params["content"] = cleaned_content
+                        xml_call = xml_call.replace(raw_content, f"\n{cleaned_content}\n")
+
+                # Parsed once above; the handler gets the params directly and runs exactly once
+                started = time.perf_counter()
+                if action == "show_payload":
+                    result = ctx.show_payload(params.get("ref"))
+                else:
+                    result = self.tools.execute_call(action, params)
+                elapsed_ms = (time.perf_counter() - started) * 1000
                 is_error = "[ERROR]" in result
-                print(Fore.YELLOW + f" [FEEDBACK]: {result[:150]}")
+                print(Fore.YELLOW + f" [FEEDBACK] {action} ({elapsed_ms:.0f} ms): {result[:150]}")
 
                 if action in ["list_directory", "read_file", "web_search", "execute_bash", "read_url"]:
                     raw_data_memory.append(f"[{action.upper()}]:\n{result[:800]}")
@@ -124,43 +146,78 @@ class WorkerNode:
                     if consecutive_errors >= 3:
                         return f"[FAILED] Stuck after {consecutive_errors} errors. Last: {result[:200]}"
                     reflection = (
-                        f"[SYSTEM FEEDBACK]:\n{result}\n\n"
                         f"[REFLECTION] Step {step+1} failed. Before your next tool call:\n"
                         "- What did the error say exactly?\n"
                         "- What was wrong with your approach?\n"
                         "- What specific tool and arguments will fix it?\n"
                         "Output ONE corrected XML tool call."
                     )
-                    messages.append({"role": "assistant", "content": xml_call})
-                    messages.append({"role": "user", "content": reflection})
+                    ctx.add_turn(xml_call, reflection, result=result, action=action, params=params, is_error=True)
                 else:
                     consecutive_errors = 0
                     execution_log.append(action)
                     if self.on_step_done:
                         self.on_step_done(len(execution_log) - 1, action, result[:200])
-                    messages.append({"role": "assistant", "content": xml_call})
-                    messages.append({"role": "user", "content": f"[SYSTEM FEEDBACK]:\n{result}\n\nOutput your next XML tool call, or use finish if done."})
+                    ctx.add_turn(xml_call, "Output your next XML tool call, or use finish if done.", result=result, action=action, params=params)
 
             except Exception as e:
                 return f"[CRITICAL ERROR] Step {step + 1}: {e}"
 
         return f"[WARNING] Reached {WORKER_MAX_STEPS}-step limit. Steps taken: {' -> '.join(execution_log)}"
 
-    def execute_plan(self, steps: list) -> str:
-        print(Fore.MAGENTA + f" [WORKER] Executing {len(steps)}-step plan...")
-        context = ""
-        results = []
-        for i, step in enumerate(steps):
-            print(Fore.MAGENTA + f" [PLAN] Step {i+1}/{len(steps)}: {step[:80]}")
-            result = self.execute_task(step, context=context)
-            results.append(f"Step {i+1} ({step[:40]}): {result[:300]}")
-            if self.on_step_done:
-                self.on_step_done(i, step[:80], result[:200])
-            if "[FAILED]" in result or "[CRITICAL ERROR]" in result:
-                print(Fore.RED + f" [PLAN] Aborted at step {i+1}.")
-                break
-            context = result[:500]
-        return "\n".join(results)
+    def execute_plan(self, plan: list) -> str:
+        """
+        Run a plan: either ordered step strings (each step gets the previous
+        result) or Executive.plan_graph nodes.  A step starts once every step
+        it depends on has succeeded, up to WORKER_PLAN_PARALLELISM at a time,
+        and only receives its dependencies' results as context.  Steps that
+        depend on a failed step are skipped; independent ones still run.
+        """
+        nodes = plan if plan and isinstance(plan[0], dict) else linear_plan(plan)
+        print(Fore.MAGENTA + f" [WORKER] Executing {len(nodes)}-step plan...")
+        waiting = {node["id"]: node for node in nodes}
+        results = {}
+        failed = set()
+        running = {}
+        with ThreadPoolExecutor(max_workers=WORKER_PLAN_PARALLELISM, thread_name_prefix="plan") as pool:
+            while waiting or running:
+                for node_id, node in list(waiting.items()):
+                    if any(dep in failed for dep in node["after"]):
+                        del waiting[node_id]
+                        failed.add(node_id)
+                        results[node_id] = "[SKIPPED] A step it depends on failed."
+                        print(Fore.RED + f" [PLAN] Skipping step {node_id + 1}: dependency failed.")
+                    elif all(dep in results for dep in node["after"]):
+                        del waiting[node_id]
+                        context = self._dependency_context(node, results)
+                        print(Fore.MAGENTA + f" [PLAN] Step {node_id + 1}/{len(nodes)}: {node['step'][:80]}")
+                        running[pool.submit(self.execute_task, node["step"], context)] = node
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = f"[CRITICAL ERROR] {e}"
+                    results[node["id"]] = result
+                    if self.on_step_done:
+                        self.on_step_done(node["id"], node["step"][:80], result[:200])
+                    if "[FAILED]" in result or "[CRITICAL ERROR]" in result:
+                        failed.add(node["id"])
+                        print(Fore.RED + f" [PLAN] Step {node['id'] + 1} failed.")
+        return "\n".join(
+            f"Step {node['id'] + 1} ({node['step'][:40]}): {results[node['id']][:300]}"
+            for node in nodes if node["id"] in results
+        )
+
+    @staticmethod
+    def _dependency_context(node: dict, results: dict) -> str:
+        deps = node["after"]
+        if len(deps) == 1:
+            return results[deps[0]][:500]
+        return "\n\n".join(f"[STEP {dep + 1} RESULT]:\n{results[dep][:500]}" for dep in deps)
 
     def warmup(self):
         print(Fore.LIGHTBLACK_EX + f" [WORKER] Warming up ({self.model_name})...")
@@ -168,28 +225,3 @@ class WorkerNode:
             vram.ensure_loaded("worker")
         except Exception as e:
             print(Fore.RED + f" [WORKER] Warmup failed: {e}")
-def extract_tool_call(llm_output: str) -> dict:
-    """
-    A robust, forgiving extractor for LLM XML tool calls.
-    Handles capitalization, hallucinated attributes, and line breaks.
-    """
-    result = {"tool": None, "parameters": {}}
-    
-    tool_match = re.search(r'<tool\b[^>]*>(.*?)</tool>', llm_output, re.IGNORECASE | re.DOTALL)
-    
-    if tool_match:
-        attr_match = re.search(r'<tool\b[^>]*name=["\']([^"\']+)["\']', llm_output, re.IGNORECASE)
-        if attr_match:
-            result["tool"] = attr_match.group(1).strip()
-        else:
-            result["tool"] = tool_match.group(1).strip()
-            
-    param_matches = re.finditer(r'<([a-zA-Z0-9_]+)\b[^>]*>(.*?)</\1>', llm_output, re.IGNORECASE | re.DOTALL)
-    for match in param_matches:
-        tag_name = match.group(1).lower()
-        tag_content = match.group(2).strip()
-        
-        if tag_name != 'tool':
-            result["parameters"][tag_name] = tag_content
-
-    return result
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Worker Context — the message list for one WorkerNode task, kept inside the
+worker model's token budget.
+
+The system prompt and the task are always sent verbatim.  The newest steps
+(WORKER_CONTEXT_RECENT_STEPS) go in as the original assistant call and
+system feedback; older ones are compacted into one line each:
+
+    3. read_file(filepath=main.py) -> OK: [SUCCESS] File contents: import os ... [payload #2]
+
+Large tool results are held here by reference: only the newest step shows
+its result in full, earlier verbatim steps show the head and a
+``[payload #n]`` marker, and the model can bring one back with the
+show_payload tool.  If the prompt is still over budget, more steps are
+compacted, and finally the ContextPacker trims verbatim steps, the newest
+result last and no further than ``payload_tokens``.  The compacted summary
+is small and pinned: it is never trimmed.
+"""
+
+import hashlib
+from colorama import Fore
+from core.brain.interface.prompt import ContextBlock, ContextPacker, PINNED, estimate_tokens
+from config import WORKER_CONTEXT_RECENT_STEPS, WORKER_CONTEXT_PAYLOAD_TOKENS
+
+# Argument values longer than this are replaced by their length and a short hash
+_ARG_CHARS = 40
+# Characters of the tool result kept in a compacted step line
+_OUTCOME_CHARS = 100
+
+
+def digest_args(params: dict) -> str:
+    parts = []
+    for key, value in (params or {}).items():
+        value = " ".join(str(value).split())
+        if len(value) > _ARG_CHARS:
+            value = f"<{len(value)} chars #{hashlib.sha1(value.encode('utf-8')).hexdigest()[:8]}>"
+        parts.append(f"{key}={value}")
+    return ", ".join(parts)
+
+
+class WorkerContext:
+    def __init__(self, system_prompt: str, task_message: str, budget: int,
+                 recent_steps: int = WORKER_CONTEXT_RECENT_STEPS, payload_tokens: int = WORKER_CONTEXT_PAYLOAD_TOKENS):
+        self.system_prompt = system_prompt
+        self.task_message = task_message
+        self.budget = budget
+        self.recent_steps = recent_steps
+        self.payload_tokens = payload_tokens
+        self.turns = []
+        self.payloads = {}      # ref -> full tool result
+        self.last_report = {}
+
+    @classmethod
+    def for_model(cls, model_name: str, system_prompt: str, task_message: str) -> "WorkerContext":
+        return cls(system_prompt, task_message, ContextPacker.for_model(model_name).budget)
+
+    def payload(self, ref: int) -> str:
+        return self.payloads.get(ref, "")
+
+    def show_payload(self, ref: str) -> str:
+        """Result for the show_payload tool: the full text of an earlier result."""
+        ref = (ref or "").strip().lstrip("#")
+        text = self.payload(int(ref)) if ref.isdigit() else ""
+        return text or f"[ERROR] No payload #{ref}. Use a number from a [payload #n] marker."
+
+    # ------------------------------------------------------------------
+    def add_turn(self, call: str, instruction: str, result: str = None, action: str = None,
+                 params: dict = None, is_error: bool = False):
+        """
+        Record one worker turn: the model's *call* and the reply it gets,
+        ``[SYSTEM FEEDBACK]`` with *result* followed by *instruction*, or just
+        *instruction* when no tool ran.
+        """
+        ref = None
+        if result is not None and estimate_tokens(result) > self.payload_tokens:
+            # show_payload hands back a stored payload; keep its original number
+            ref = next((n for n, text in self.payloads.items() if text is result), None)
+            if ref is None:
+                ref = len(self.payloads) + 1
+                self.payloads[ref] = result
+        self.turns.append({
+            "call": call, "instruction": instruction, "result": result,
+            "action": action, "params": params or {}, "is_error": is_error, "ref": ref,
+        })
+
+    @property
+    def last_feedback(self) -> str:
+        return self._feedback(len(self.turns) - 1, full=True) if self.turns else ""
+
+    def _feedback(self, index: int, full: bool) -> str:
+        turn = self.turns[index]
+        result = turn["result"]
+        if result is None:
+            return turn["instruction"]
+        if turn["ref"] and not full:
+            head = result[:self.payload_tokens * 4].rstrip()
+            result = (f"{head}\n[... payload #{turn['ref']}: {len(result)} chars in total; "
+                      f"use show_payload with <ref>{turn['ref']}</ref> to see all of it ...]")
+        label = f" (payload #{turn['ref']})" if turn["ref"] else ""
+        return f"[SYSTEM FEEDBACK]{label}:\n{result}\n\n{turn['instruction']}"
+
+    def _summary_line(self, index: int) -> str:
+        turn = self.turns[index]
+        if turn["result"] is None:
+            outcome = " ".join(turn["instruction"].split())[:_OUTCOME_CHARS]
+        else:
+            status = "ERROR" if turn["is_error"] else "OK"
+            outcome = f"{status}: " + " ".join(turn["result"].split())[:_OUTCOME_CHARS]
+        ref = f" [payload #{turn['ref']}]" if turn["ref"] else ""
+        return f"{index + 1}. {turn['action'] or '(no tool call)'}({digest_args(turn['params'])}) -> {outcome}{ref}"
+
+    # ------------------------------------------------------------------
+    def _blocks(self, split: int) -> list:
+        blocks = [
+            ContextBlock("system", self.system_prompt, PINNED),
+            ContextBlock("task", self.task_message, PINNED, role="user"),
+        ]
+        if split > 0:
+            lines = [self._summary_line(i) for i in range(split)]
+            # One short line per step, so it stays pinned
+            blocks.append(ContextBlock("earlier_steps", "[EARLIER STEPS - compacted]\n" + "\n".join(lines), PINNED, role="user"))
+        last = len(self.turns) - 1
+        for i in range(split, len(self.turns)):
+            latest = i == last
+            blocks.append(ContextBlock(f"step{i + 1}_call", self.turns[i]["call"], 70 if latest else 40, role="assistant", min_tokens=64))
+            blocks.append(ContextBlock(f"step{i + 1}_feedback", self._feedback(i, full=latest), 80 if latest else 30, role="user",
+                                       min_tokens=self.payload_tokens if latest else 32))
+        return blocks
+
+    def messages(self) -> list:
+        """Chat messages for the next worker turn, within the token budget."""
+        recent = min(self.recent_steps, len(self.turns))
+        while True:
+            blocks = self._blocks(len(self.turns) - recent)
+            # The newest step always stays verbatim: the model has to see its result
+            if sum(b.tokens() for b in blocks) <= self.budget or recent <= 1:
+                break
+            recent -= 1
+        kept, report = ContextPacker(self.budget).pack(blocks)
+        report["compacted_steps"] = len(self.turns) - recent
+        self.last_report = report
+        if report["tokens_before"] > self.budget:
+            trimmed = ", ".join(f"{b['name']} {b['tokens']}->{b['kept']}" for b in report["blocks"] if b["action"] != "kept")
+            print(Fore.YELLOW + f" [WORKER] Context over budget ({report['tokens_before']}/{self.budget}), trimmed: {trimmed}")
+        return [{"role": b.role, "content": b.content} for b in kept if b.content]
@@ -1,17 +1,24 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
 from datetime import datetime
 import uuid
 import ollama
 from colorama import Fore
 from config import MEMORY_DB_PATH, BUTLER_MODEL
+from core.brain.cognition.embedder import embedder as _shared_embedder
+from core.brain.cognition.store import store
+from core.brain.cognition.scoring import MemoryScorer
 
 class Archivist:
     def __init__(self, db_path=MEMORY_DB_PATH, model_name=BUTLER_MODEL):
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.db_path = db_path
+        self.embedder = _shared_embedder
         self.model_name = model_name
-        self.episodes = self.client.get_or_create_collection(name="episodes", metadata={"hnsw:space": "cosine"})
+        self._memory = None
+        # Episodes have no importance or access history: rank on similarity and recency
+        self.scorer = MemoryScorer(weights={"importance": 0.0, "access": 0.0, "similarity": 0.75, "recency": 0.25})
+
+    @property
+    def episodes(self):
+        return store.collection("episodes", path=self.db_path)
 
     def summarize_session(self, conversation: list) -> str:
         if not conversation: return ""
@@ -27,8 +34,10 @@ class Archivist:
             return ""
 
     def summarize_and_save_facts(self, conversation: list):
-        from core.brain.cognition.memory import MemorySystem
-        mem = MemorySystem()
+        if self._memory is None:
+            from core.brain.cognition.memory import MemorySystem
+            self._memory = MemorySystem(db_path=self.db_path)
+        mem = self._memory
         prompt = (
             "Extract up to 5 standalone factual statements about the user or their projects from this conversation.\n"
             "Output ONLY a JSON array of strings. No explanation.\n"
@@ -41,10 +50,9 @@ class Archivist:
             match = re.search(r'\[.*?\]', response, re.DOTALL)
             if match:
                 facts = json.loads(match.group(0))
-                for fact in facts:
-                    if isinstance(fact, str) and 5 < len(fact) < 200:
-                        if mem.save_memory(fact, importance=6.0, tags=["auto_extracted"]):
-                            print(Fore.MAGENTA + f" [ARCHIVIST] Mid-session fact saved: {fact[:60]}")
+                facts = [f for f in facts if isinstance(f, str) and 5 < len(f) < 200]
+                for fact in mem.save_memories(facts, importance=6.0, tags=["auto_extracted"]):
+                    print(Fore.MAGENTA + f" [ARCHIVIST] Mid-session fact saved: {fact[:60]}")
         except Exception as e:
             print(Fore.RED + f" [ARCHIVIST] Fact extraction failed: {e}")
 
@@ -56,27 +64,32 @@ class Archivist:
             return False
         timestamp = session_start.strftime("%Y-%m-%d %H:%M")
         episode = f"[{timestamp}] {summary}"
-        self.episodes.add(
-            documents=[episode],
-            embeddings=[self.embedder.encode(episode).tolist()],
-            ids=[str(uuid.uuid4())],
-            metadatas=[{"date": session_start.strftime("%Y-%m-%d"), "timestamp": timestamp, "type": "session"}]
-        )
+        embedding = self.embedder.encode(episode).tolist()
+        with store.write_lock:
+            self.episodes.add(
+                documents=[episode],
+                embeddings=[embedding],
+                ids=[str(uuid.uuid4())],
+                metadatas=[{"date": session_start.strftime("%Y-%m-%d"), "timestamp": timestamp, "type": "session"}]
+            )
         print(Fore.GREEN + f" [ARCHIVIST] Session archived: {summary[:60]}...")
         return True
 
-    def recall_episodes(self, query: str, n: int = 3, threshold: float = 0.40) -> list: 
-        if self.episodes.count() == 0: return []
-        
+    def recall_episodes(self, query: str, n: int = 3, threshold: float = 0.40, query_embedding=None) -> list:
+        total = self.episodes.count()
+        if total == 0: return []
+        if query_embedding is None:
+            query_embedding = self.embedder.encode(query)
+
         results = self.episodes.query(
-            query_embeddings=[self.embedder.encode(query).tolist()],
-            n_results=min(n, self.episodes.count()),
-            include=["documents", "distances"]
+            query_embeddings=[list(map(float, query_embedding))],
+            n_results=min(n * 3, total),
+            include=["documents", "distances", "metadatas"]
         )
         
-        valid_episodes = []
-        for doc, dist in zip(results['documents'][0], results['distances'][0]):
+        candidates = []
+        for doc, dist, meta in zip(results['documents'][0], results['distances'][0], results['metadatas'][0]):
             if dist < threshold:
-                valid_episodes.append(doc)
+                candidates.append({"text": doc, "relevance": 1.0 - dist, "timestamp": (meta or {}).get("date", "")})
                 
-        return valid_episodes
\ No newline at end of file
+        return [c["text"] for c in self.scorer.rank(candidates)[:n]]
\ No newline at end of file
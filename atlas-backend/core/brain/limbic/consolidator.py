@@ -1,31 +1,113 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
-import numpy as np
-from sklearn.cluster import AgglomerativeClustering
+"""
+Consolidator — merges clusters of near-duplicate long-term memories into one
+summary fact, incrementally.
+
+Each run only looks at memories it has not reviewed before.  For a batch of
+those it fetches the stored embeddings, asks the vector index for their
+nearest neighbours in one query, and grows a cluster from each seed with
+complete linkage: a neighbour joins only if it is within ``threshold``
+cosine distance of every member already in the cluster, so no two merged
+facts are further apart than that, whichever seed comes first.  Reviewed
+ids are persisted, so a run on an unchanged store does no work at all.
+``budget_seconds`` bounds a run; whatever is left is picked up by the next
+one (idle heartbeat or shutdown).
+
+Cluster summaries are generated CONSOLIDATION_WORKERS at a time through the
+VRAM manager's butler slot.  If the merge fails after the summary came back,
+the summary is kept, keyed by a hash of the sorted member texts, so the
+retry does not call the LLM again; it is dropped once the merge lands or a
+member disappears.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
 import ollama
 import uuid
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from colorama import Fore
+from config import MEMORY_DB_PATH, BUTLER_MODEL, CONSOLIDATION_STATE_PATH, CONSOLIDATION_WORKERS, CONSOLIDATION_THRESHOLD
+from core.brain.interface.vram_manager import vram
+from core.brain.cognition.embedder import embedder as _shared_embedder
+from core.brain.cognition.store import store
+
+# Seeds examined per neighbour query, and neighbours fetched per seed
+_SEED_BATCH = 32
+_NEIGHBOURS = 8
+
+# Summaries of failed merges kept in the state file
+_SUMMARY_CACHE_SIZE = 512
 
-class Consolidator:    
-    def __init__(self, db_path="./atlas_memory", model_name="llama3.1:latest"):
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+def _cluster_hash(texts: list) -> str:
+    return hashlib.sha1("\n".join(sorted(texts)).encode("utf-8")).hexdigest()
+
+
+class Consolidator:
+    def __init__(self, db_path=MEMORY_DB_PATH, model_name=BUTLER_MODEL, state_path=CONSOLIDATION_STATE_PATH):
+        self.db_path = db_path
+        self.embedder = _shared_embedder
         self.model_name = model_name
-        self.collection = self.client.get_or_create_collection(
-            name="atlas_long_term",
-            metadata={"hnsw:space": "cosine"}
-        )
-    
-    def get_all_memories(self) -> tuple:
-        if self.collection.count() == 0: return [], [], []
-        results = self.collection.get(include=["documents", "embeddings"])
-        return results['ids'], results['documents'], results['embeddings']
-    
-    def cluster_memories(self, embeddings: list, threshold: float = 0.5) -> list:
-        if len(embeddings) < 2: return [0] * len(embeddings)
-        clustering = AgglomerativeClustering(n_clusters=None, distance_threshold=threshold, metric='cosine', linkage='average')
-        return clustering.fit_predict(np.array(embeddings)).tolist()
-    
-    def summarize_cluster(self, memories: list) -> str:
+        self.state_path = state_path
+        self._run_lock = threading.Lock()
+        self._state = self._load_state()
+        self._stats_lock = threading.Lock()
+        self.llm_calls = 0
+        self.summary_ms = []
+
+    @property
+    def collection(self):
+        return store.collection("atlas_long_term", path=self.db_path)
+
+    def _load_state(self) -> dict:
+        state = {"reviewed": [], "summaries": {}}
+        if self.state_path and os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    state.update(json.load(f))
+            except Exception as e:
+                print(Fore.RED + f" [CONSOLIDATOR] State load failed, starting fresh: {e}")
+        # Older state files also hold merged cluster hashes and bare summary strings; both are dropped
+        summaries = {k: v for k, v in dict(state["summaries"]).items() if isinstance(v, dict)}
+        return {"reviewed": set(state["reviewed"]), "summaries": summaries}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                summaries = self._state["summaries"]
+                if len(summaries) > _SUMMARY_CACHE_SIZE:
+                    # Insertion order is oldest first
+                    self._state["summaries"] = summaries = dict(list(summaries.items())[-_SUMMARY_CACHE_SIZE:])
+                json.dump({
+                    "reviewed": sorted(self._state["reviewed"]),
+                    "summaries": summaries,
+                }, f)
+        except Exception as e:
+            print(Fore.RED + f" [CONSOLIDATOR] State save failed: {e}")
+
+    def pending_ids(self) -> list:
+        """Ids in the store that no run has reviewed yet."""
+        if self.collection.count() == 0:
+            return []
+        all_ids = self.collection.get(include=[])["ids"]
+        # Forget reviewed ids and retry summaries whose members no longer exist, so the state file stays small
+        self._state["reviewed"].intersection_update(all_ids)
+        present = set(all_ids)
+        self._state["summaries"] = {k: v for k, v in self._state["summaries"].items() if present.issuperset(v["ids"])}
+        return [i for i in all_ids if i not in self._state["reviewed"]]
+
+    def summarize_cluster(self, memories: list):
+        """Return the merged statement, or None if the LLM call failed."""
         if len(memories) == 1: return memories[0]
         prompt = (
             "Combine these related facts about the user into ONE concise statement.\n"
@@ -34,33 +116,142 @@ class Consolidator:
             f"Facts:\n{chr(10).join(f'- {m}' for m in memories)}\nCombined statement:"
         )
         try:
-            return ollama.generate(model=self.model_name, prompt=prompt)['response'].strip()
-        except:
-            return memories[0]  
-    
-    def consolidate(self, min_cluster_size: int = 2, threshold: float = 0.5) -> dict:
-        ids, documents, embeddings = self.get_all_memories()
-        if len(documents) < min_cluster_size:
-            return {"consolidated": 0, "remaining": len(documents)}
-        
-        clusters = {}
-        for idx, label in enumerate(self.cluster_memories(embeddings, threshold)):
-            clusters.setdefault(label, {"ids": [], "docs": []})
-            clusters[label]["ids"].append(ids[idx])
-            clusters[label]["docs"].append(documents[idx])
-        
+            return ollama.generate(
+                model=self.model_name, prompt=prompt,
+                keep_alive=vram.get_keep_alive("butler")
+            )['response'].strip()
+        except Exception as e:
+            print(Fore.RED + f" [CONSOLIDATOR] Summary failed, cluster left for the next run: {e}")
+            return None
+
+    def _summarize_cached(self, key: str, memories: list) -> str:
+        cached = self._state["summaries"].get(key)
+        if cached is not None:
+            return cached["summary"]
+        start = time.perf_counter()
+        summary = self.summarize_cluster(memories)
+        with self._stats_lock:
+            self.summary_ms.append((time.perf_counter() - start) * 1000)
+            self.llm_calls += 1
+        return summary
+
+    def consolidate(self, min_cluster_size: int = 2, threshold: float = CONSOLIDATION_THRESHOLD, budget_seconds: float = None) -> dict:
+        if not self._run_lock.acquire(blocking=False):
+            return {"consolidated": 0, "skipped": "already running"}
+        try:
+            return self._consolidate(min_cluster_size, threshold, budget_seconds)
+        finally:
+            self._run_lock.release()
+
+    def _consolidate(self, min_cluster_size: int, threshold: float, budget_seconds: float) -> dict:
+        started = time.monotonic()
+        calls_before, timings_before = self.llm_calls, len(self.summary_ms)
+        deadline = started + budget_seconds if budget_seconds else None
+        original = self.collection.count()
+        pending = self.pending_ids()
+        reviewed = self._state["reviewed"]
         consolidated_count = 0
-        for label, cluster in clusters.items():
-            if len(cluster["docs"]) >= min_cluster_size:
-                summary = self.summarize_cluster(cluster["docs"])
-                if summary and len(summary) > 10:
-                    self.collection.delete(ids=cluster["ids"])
-                    self.collection.add(
-                        documents=[summary],
-                        embeddings=[self.embedder.encode(summary).tolist()],
-                        ids=[str(uuid.uuid4())],
-                        metadatas=[{"consolidated": True, "source_count": len(cluster["docs"])}]
-                    )
-                    consolidated_count += len(cluster["docs"])
-        
-        return {"original": len(documents), "consolidated": consolidated_count, "remaining": self.collection.count()}
\ No newline at end of file
+        merged_clusters = 0
+
+        while pending and (deadline is None or time.monotonic() < deadline):
+            seeds, pending = pending[:_SEED_BATCH], pending[_SEED_BATCH:]
+            got = self.collection.get(ids=seeds, include=["documents", "embeddings"])
+            if not got["ids"]:
+                continue
+            neighbours = self.collection.query(
+                query_embeddings=[list(map(float, e)) for e in got["embeddings"]],
+                n_results=min(_NEIGHBOURS, self.collection.count()),
+                include=["documents", "distances", "embeddings"]
+            )
+
+            # Pick disjoint clusters for this batch, then summarize them concurrently
+            consumed = set()
+            clusters = []
+            for row, seed_id in enumerate(got["ids"]):
+                if seed_id in consumed:
+                    continue
+                cluster = {seed_id: got["documents"][row]}
+                members = [_unit(got["embeddings"][row])]
+                # Neighbours come nearest first; each must be close to every member so far
+                for doc_id, doc, dist, vec in zip(neighbours["ids"][row], neighbours["documents"][row],
+                                                  neighbours["distances"][row], neighbours["embeddings"][row]):
+                    if dist >= threshold or doc_id in consumed or doc_id in cluster:
+                        continue
+                    vec = _unit(vec)
+                    if all(1.0 - float(np.dot(vec, m)) < threshold for m in members):
+                        cluster[doc_id] = doc
+                        members.append(vec)
+                reviewed.add(seed_id)
+                if len(cluster) < min_cluster_size:
+                    continue
+                key = _cluster_hash(list(cluster.values()))
+                consumed.update(cluster)
+                clusters.append((key, cluster))
+
+            if clusters and any(key not in self._state["summaries"] for key, _ in clusters):
+                vram.ensure_loaded("butler")
+            with ThreadPoolExecutor(max_workers=CONSOLIDATION_WORKERS) as pool:
+                futures = {
+                    pool.submit(self._summarize_cached, key, list(cluster.values())): (key, cluster)
+                    for key, cluster in clusters
+                }
+                for future in as_completed(futures):
+                    key, cluster = futures[future]
+                    if deadline is not None and time.monotonic() >= deadline:
+                        for other in futures:
+                            other.cancel()
+                    if future.cancelled():
+                        # Out of budget before this cluster started: leave it for the next run
+                        reviewed.difference_update(cluster)
+                        consumed.difference_update(cluster)
+                        pending = [i for i in cluster if i in got["ids"]] + pending
+                        continue
+                    docs = list(cluster.values())
+                    summary = future.result()
+                    if not summary or len(summary) <= 10:
+                        # Keep every fact and leave the cluster pending for the next run
+                        reviewed.difference_update(cluster)
+                        continue
+                    summary_id = str(uuid.uuid4())
+                    try:
+                        embedding = self.embedder.encode(summary).tolist()
+                        with store.write_lock:
+                            self.collection.delete(ids=list(cluster))
+                            self.collection.add(
+                                documents=[summary],
+                                embeddings=[embedding],
+                                ids=[summary_id],
+                                metadatas=[{"consolidated": True, "source_count": len(docs)}]
+                            )
+                    except Exception as e:
+                        # Keep the summary so the retry next run skips the LLM call
+                        print(Fore.RED + f" [CONSOLIDATOR] Merge failed, cluster left for the next run: {e}")
+                        self._state["summaries"][key] = {"summary": summary, "ids": sorted(cluster)}
+                        reviewed.difference_update(cluster)
+                        continue
+                    self._state["summaries"].pop(key, None)
+                    reviewed.difference_update(cluster)
+                    reviewed.add(summary_id)
+                    consolidated_count += len(docs)
+                    merged_clusters += 1
+            # Merged members may still be queued as seeds
+            pending = [p for p in pending if p not in consumed]
+            self._save_state()
+
+        self._save_state()
+        elapsed = time.monotonic() - started
+        run_ms = self.summary_ms[timings_before:]
+        if consolidated_count or pending:
+            print(Fore.MAGENTA + f" [CONSOLIDATOR] {merged_clusters} clusters merged ({consolidated_count} facts) "
+                  f"in {elapsed:.1f}s, {self.llm_calls - calls_before} LLM calls, "
+                  f"{len(pending)} memories left for the next run")
+        return {
+            "original": original,
+            "consolidated": consolidated_count,
+            "remaining": self.collection.count(),
+            "pending": len(pending),
+            "seconds": round(elapsed, 2),
+            "llm_calls": self.llm_calls - calls_before,
+            "summary_ms_avg": round(sum(run_ms) / len(run_ms), 1) if run_ms else 0.0,
+            "summary_ms_max": round(max(run_ms), 1) if run_ms else 0.0,
+        }
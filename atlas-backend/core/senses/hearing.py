@@ -3,15 +3,55 @@ import sounddevice as sd
 import torch
 import queue
 import threading
-import collections
 import os
+import time
 from colorama import Fore
 from faster_whisper import WhisperModel
+from core.senses.ring import AudioRing
+from config import EAR_STREAMING, EAR_PARTIAL_INTERVAL
 
 os.environ['KMP_DUPLICATE_LIB_OK']='True'
 
+_WHISPER_PROMPT = "Atlas, exit, shutdown, robot, engineering, system, vitals, hypothesize, imagine."
+
+
+def _norm_word(word: str) -> str:
+    return word.lower().strip(".,!?;:\"'")
+
+
+class _Utterance:
+    """
+    Streaming state for one utterance.  Words become *committed* once two
+    consecutive partial passes agree on them (local agreement); committed
+    words never change afterwards.
+    """
+
+    def __init__(self, utterance_id: int):
+        self.id = utterance_id
+        self.previous = []
+        self.committed = []
+        self.settled_at = 0       # samples covered by a pass that agreed end-to-end with the one before
+        self.speech_end = 0       # segment length at the last voiced window
+        self.closed = False
+
+    def update(self, words: list, covered: int):
+        agreed = 0
+        limit = min(len(words), len(self.previous))
+        while agreed < limit and _norm_word(words[agreed]) == _norm_word(self.previous[agreed]):
+            agreed += 1
+        if agreed > len(self.committed):
+            self.committed = self.committed + words[len(self.committed):agreed]
+        if words and agreed == len(words) == len(self.previous):
+            self.settled_at = covered
+        self.previous = words
+
 class Ear:
-    def __init__(self, model_size="base.en", device="cuda"):
+    # VAD windows evaluated per consumer wake-up (4 x 32 ms = 128 ms)
+    VAD_BATCH_WINDOWS = 4
+    MAX_UTTERANCE_SECONDS = 30
+    CAPTURE_RING_SECONDS = 10
+
+    def __init__(self, model_size="base.en", device="cuda", streaming=EAR_STREAMING, partial_interval=EAR_PARTIAL_INTERVAL):
         print(Fore.YELLOW + f"[EAR] Loading Whisper Model ({model_size}) on {device}...")
         self.whisper_model = WhisperModel(model_size, device=device, compute_type="int8")
 
@@ -28,6 +68,23 @@ class Ear:
         self.sample_rate = 16000
         self.chunk_size = 512
         self.transcription_queue = queue.Queue()
+
+        # Capture -> VAD hand-off and the in-place speech segment buffer
+        self.capture_ring = AudioRing(self.sample_rate * self.CAPTURE_RING_SECONDS)
+        self._segment = np.zeros(self.sample_rate * self.MAX_UTTERANCE_SECONDS, dtype=np.float32)
+        self._segment_len = 0
+        self.input_overflows = 0
+        self._audio_seconds = 0.0
+        self._vad_cpu_seconds = 0.0
+
+        # Streaming: partial hypotheses while the user is still talking
+        self.streaming = streaming
+        self.partial_interval = partial_interval
+        self.partial_queue = queue.Queue()
+        self._whisper_lock = threading.Lock()
+        self._partial_wake = threading.Event()
+        self._current = None
+        self._utterance_count = 0
         
         self.is_listening = False
         self.current_stop_event = None
@@ -39,105 +96,212 @@ class Ear:
         self.is_listening = True
         self.stream_thread = threading.Thread(target=self._vad_audio_loop, daemon=True)
         self.stream_thread.start()
+        if self.streaming:
+            self.partial_thread = threading.Thread(target=self._partial_loop, daemon=True)
+            self.partial_thread.start()
 
     def stop_listening(self):
         self.is_listening = False
 
+    def stats(self) -> dict:
+        return {
+            "audio_seconds": round(self._audio_seconds, 1),
+            "vad_cpu_seconds": round(self._vad_cpu_seconds, 3),
+            "cpu_per_audio_second": round(self._vad_cpu_seconds / self._audio_seconds, 4) if self._audio_seconds else 0.0,
+            "input_overflows": self.input_overflows,
+            "dropped_samples": self.capture_ring.dropped,
+        }
+
+    def _on_audio(self, indata, frames, time_info, status):
+        """PortAudio callback thread: copy into the ring and return immediately."""
+        if status and status.input_overflow:
+            self.input_overflows += 1
+        self.capture_ring.write(indata[:, 0], block=False)
+
+    def _append_segment(self, audio: np.ndarray) -> bool:
+        """Copy into the preallocated segment buffer; False once it is full."""
+        room = len(self._segment) - self._segment_len
+        n = min(room, len(audio))
+        self._segment[self._segment_len:self._segment_len + n] = audio[:n]
+        self._segment_len += n
+        return n == len(audio)
+
     def _vad_audio_loop(self):
-        buffer = []
         is_speaking = False
         silence_chunks = 0
         
-        # THE PRE-ROLL BUFFER: Stores the last ~0.5 seconds of audio to catch the start of words
-        ring_buffer = collections.deque(maxlen=15) 
+        # THE PRE-ROLL BUFFER: the last ~0.5 seconds of audio, to catch the start of words
+        preroll = np.zeros(self.chunk_size * 15, dtype=np.float32)
         
         # Wait ~1.2 seconds of silence before sending to Whisper
         MAX_SILENCE_CHUNKS = int((self.sample_rate / self.chunk_size) * 1.2) 
+        partial_samples = int(self.sample_rate * self.partial_interval)
+        partial_requested = 0
+
+        # One block of windows per wake-up; tensors share memory with it (no per-chunk allocation)
+        window = self.chunk_size
+        block = np.zeros(window * self.VAD_BATCH_WINDOWS, dtype=np.float32)
+        block_cpu = torch.from_numpy(block)
+        block_dev = block_cpu if self.device == "cpu" else torch.zeros(len(block), device=self.device)
 
         print(Fore.GREEN + "[EAR] Continuous listening active. Speak naturally to interact.")
-        
-        with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='float32', blocksize=self.chunk_size) as stream:
+
+        with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='float32',
+                            blocksize=self.chunk_size, callback=self._on_audio):
             while self.is_listening:
                 try:
-                    audio_chunk, overflow = stream.read(self.chunk_size)
-                    if overflow: continue
-                        
-                    audio_np = audio_chunk.flatten()
-                    
-                    # Always keep the pre-roll buffer updated
-                    ring_buffer.append(audio_np)
-
-                    # Silero VAD evaluation
-                    audio_tensor = torch.from_numpy(audio_np).unsqueeze(0).to(self.device)
-                    speech_prob = self.vad_model(audio_tensor, self.sample_rate).item()
-
-                    # Threshold increased to 0.7 to ignore breathing/computer fans better
-                    if speech_prob > 0.7: 
-                        if not is_speaking:
-                            is_speaking = True
-                            silence_chunks = 0
-                            
-                            # Inject the pre-roll audio so we don't clip the first word!
-                            buffer = list(ring_buffer) 
-                            
-                            # Trigger Barge-in
-                            if self.current_stop_event and not self.current_stop_event.is_set():
-                                self.current_stop_event.set()
+                    if self.capture_ring.read_exact(len(block), timeout=0.5, out=block) is None:
+                        continue
+
+                    cpu_start = time.thread_time()
+                    if block_dev is not block_cpu:
+                        block_dev.copy_(block_cpu, non_blocking=True)
+
+                    # Silero carries RNN state from window to window, so the windows of a
+                    # batch are scored in order rather than stacked on a batch axis.
+                    with torch.inference_mode():
+                        probs = [
+                            self.vad_model(block_dev[i * window:(i + 1) * window].unsqueeze(0), self.sample_rate).item()
+                            for i in range(self.VAD_BATCH_WINDOWS)
+                        ]
+
+                    for i, speech_prob in enumerate(probs):
+                        audio_np = block[i * window:(i + 1) * window]
+
+                        # Threshold increased to 0.7 to ignore breathing/computer fans better
+                        if speech_prob > 0.7: 
+                            if not is_speaking:
+                                is_speaking = True
+                                silence_chunks = 0
+                                
+                                # Inject the pre-roll audio so we don't clip the first word!
+                                self._segment_len = 0
+                                self._append_segment(preroll)
+                                self._utterance_count += 1
+                                self._current = _Utterance(self._utterance_count)
+                                partial_requested = self._segment_len
+                                
+                                # Trigger Barge-in
+                                if self.current_stop_event and not self.current_stop_event.is_set():
+                                    self.current_stop_event.set()
+                            else:
+                                silence_chunks = 0
+                            full = not self._append_segment(audio_np)
+                            self._current.speech_end = self._segment_len
+                                
+                        elif is_speaking:
+                            full = not self._append_segment(audio_np)
+                            silence_chunks += 1
                         else:
-                            buffer.append(audio_np)
-                            silence_chunks = 0
-                            
-                    elif is_speaking:
-                        buffer.append(audio_np)
-                        silence_chunks += 1
-                        
-                        if silence_chunks > MAX_SILENCE_CHUNKS:
+                            full = False
+
+                        # Always keep the pre-roll buffer updated (shift in place)
+                        preroll[:-window] = preroll[window:]
+                        preroll[-window:] = audio_np
+
+                        if is_speaking and (silence_chunks > MAX_SILENCE_CHUNKS or full):
                             is_speaking = False
-                            full_audio = np.concatenate(buffer)
-                            buffer = []
-                            print(Fore.YELLOW + " [DEBUG] Silence detected. Sending to Whisper...") # <-- ADD THIS
-                            threading.Thread(target=self._transcribe_audio, args=(full_audio,), daemon=True).start()
+                            full_audio = self._segment[:self._segment_len].copy()
+                            self._segment_len = 0
+                            utterance, self._current = self._current, None
+                            print(Fore.YELLOW + " [DEBUG] Silence detected. Sending to Whisper...")
+                            threading.Thread(target=self._finalize, args=(full_audio, utterance), daemon=True).start()
+                        elif is_speaking and self.streaming and self._segment_len - partial_requested >= partial_samples:
+                            partial_requested = self._segment_len
+                            self._partial_wake.set()
+
+                    self._vad_cpu_seconds += time.thread_time() - cpu_start
+                    self._audio_seconds += len(block) / self.sample_rate
                 except Exception as e:
                     print(Fore.RED + f"[EAR] Audio read error: {e}")
 
-    def _transcribe_audio(self, audio_array):
-        try:
-            amplitude = np.abs(audio_array).mean()
-            print(Fore.CYAN + f" [DEBUG] Raw audio amplitude: {amplitude:.5f}")
-            if amplitude < 0.005: 
-                 return
-
+    def _transcribe(self, audio_array) -> str:
+        with self._whisper_lock:
             segments, info = self.whisper_model.transcribe(
                 audio_array, 
                 beam_size=1, 
                 condition_on_previous_text=False,
+                without_timestamps=True,
                 # Added 'hypothesize' and 'imagine' to bias the model towards your Romanian accent!
-                initial_prompt="Atlas, exit, shutdown, robot, engineering, system, vitals, hypothesize, imagine." 
+                initial_prompt=_WHISPER_PROMPT
             )
-            text = " ".join([s.text for s in segments]).strip()
-            
-            if len(text) < 3: return
+            return " ".join([s.text for s in segments]).strip()
+
+    def _partial_loop(self):
+        """Re-transcribe the growing segment every ``partial_interval`` seconds of speech."""
+        while self.is_listening:
+            if not self._partial_wake.wait(0.5):
+                continue
+            self._partial_wake.clear()
+            utterance = self._current
+            if utterance is None or utterance.closed:
+                continue
+            n = self._segment_len
+            audio = self._segment[:n].copy()
+            if utterance is not self._current:
+                continue      # a new utterance started over the buffer mid-copy
+            try:
+                text = self._transcribe(audio)
+            except Exception as e:
+                print(Fore.RED + f"[EAR] Partial transcription error: {e}")
+                continue
+            if utterance.closed:
+                continue
+            utterance.update(text.split(), n)
+            self.partial_queue.put({
+                "utterance": utterance.id,
+                "stable": " ".join(utterance.committed),
+                "text": text,
+                "final": False,
+            })
+
+    def _finalize(self, audio_array, utterance=None):
+        text = ""
+        try:
+            amplitude = np.abs(audio_array).mean()
+            print(Fore.CYAN + f" [DEBUG] Raw audio amplitude: {amplitude:.5f}")
+            if amplitude < 0.005: 
+                 return
+
+            # Wait out an in-flight partial pass, then stop further ones
+            with self._whisper_lock:
+                if utterance is not None:
+                    utterance.closed = True
+            if utterance is not None and utterance.committed and utterance.settled_at >= utterance.speech_end:
+                # Two passes already agreed on everything up to the end of speech
+                text = " ".join(utterance.committed)
+                print(Fore.LIGHTBLACK_EX + " [EAR] Final transcript taken from stable partials")
+            else:
+                text = self._transcribe(audio_array)
+            text = self._accept(text)
+        except Exception as e:
+            print(Fore.RED + f"[EAR] Transcription error: {e}")
+        finally:
+            if utterance is not None and self.streaming:
+                self.partial_queue.put({"utterance": utterance.id, "stable": text, "text": text, "final": True})
+
+    def _accept(self, text: str) -> str:
+        """Drop hallucinations and junk; queue and return the text that survives."""
+        if len(text) < 3: return ""
             
-            words = text.lower().replace('.', '').replace(',', '').split()
-            if len(words) > 5:
-                unique_words = len(set(words))
-                diversity_ratio = unique_words / len(words)
-                if diversity_ratio < 0.4: 
-                    # GLASS BRAIN PRINT:
-                    print(Fore.LIGHTBLACK_EX + f" [EAR] Dropped hallucination (repetitive): {text}")
-                    return 
-
-            junk_phrases = ["thank you", "okay", "bye", "subscribe", "it's all good", "all good", "thanks for watching"]
-            lower_text = text.lower()
-            if any(junk in lower_text for junk in junk_phrases) and len(words) < 15:
+        words = text.lower().replace('.', '').replace(',', '').split()
+        if len(words) > 5:
+            unique_words = len(set(words))
+            diversity_ratio = unique_words / len(words)
+            if diversity_ratio < 0.4: 
                 # GLASS BRAIN PRINT:
-                print(Fore.LIGHTBLACK_EX + f" [EAR] Dropped junk phrase: {text}")
-                return 
-                
-            self.transcription_queue.put(text)
+                print(Fore.LIGHTBLACK_EX + f" [EAR] Dropped hallucination (repetitive): {text}")
+                return ""
+
+        junk_phrases = ["thank you", "okay", "bye", "subscribe", "it's all good", "all good", "thanks for watching"]
+        lower_text = text.lower()
+        if any(junk in lower_text for junk in junk_phrases) and len(words) < 15:
+            # GLASS BRAIN PRINT:
+            print(Fore.LIGHTBLACK_EX + f" [EAR] Dropped junk phrase: {text}")
+            return ""
             
-        except Exception as e:
-            print(Fore.RED + f"[EAR] Transcription error: {e}")
+        self.transcription_queue.put(text)
+        return text
 
     def wait_for_input(self):
         return self.transcription_queue.get()
\ No newline at end of file
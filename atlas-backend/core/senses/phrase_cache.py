@@ -0,0 +1,142 @@
+"""
+Phrase Cache — rendered speech for phrases ATLAS says over and over.
+
+Acks, habit replies and fallback greetings are synthesised once and kept as
+float32 PCM in a single memory-mapped arena file.  A small JSON index maps
+hash(text, voice blend, speed) -> (offset, length, last_used).  When the
+arena goes over its size cap the least-recently-used phrases are evicted
+and the file is compacted.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+from colorama import Fore
+
+_BYTES_PER_SAMPLE = 4
+
+
+class PhraseCache:
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._data_path = os.path.join(directory, "phrases.pcm")
+        self._index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._map = None
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key(text: str, blend: dict, speed: float) -> str:
+        blend_sig = ",".join(f"{v}:{w:.3f}" for v, w in sorted(blend.items()))
+        return hashlib.sha1(f"{text.strip()}|{blend_sig}|{speed:.3f}".encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> dict:
+        if os.path.exists(self._index_path) and os.path.exists(self._data_path):
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def _save_index(self):
+        try:
+            with open(self._index_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+        except Exception as e:
+            print(Fore.RED + f" [VOICE CACHE] Index save failed: {e}")
+
+    def _arena(self):
+        if self._map is None and os.path.exists(self._data_path) and os.path.getsize(self._data_path) > 0:
+            self._map = np.memmap(self._data_path, dtype=np.float32, mode="r")
+        return self._map
+
+    def _release_map(self):
+        # Windows refuses to replace/extend a file with a live mapping on it
+        self._map = None
+
+    # ------------------------------------------------------------------
+    def get(self, key: str):
+        with self._lock:
+            entry = self._index.get(key)
+            arena = self._arena() if entry else None
+            if entry is None or arena is None or entry["offset"] + entry["length"] > len(arena):
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+            self.hits += 1
+            # Copy out so no caller ever holds a view into the mapping
+            return np.array(arena[entry["offset"]:entry["offset"] + entry["length"]])
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def put(self, key: str, audio):
+        audio = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+        size = audio.nbytes
+        if size == 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._index:
+                return
+            self._evict_for(size)
+            self._release_map()
+            with open(self._data_path, "ab") as f:
+                offset = f.tell() // _BYTES_PER_SAMPLE
+                f.write(audio.tobytes())
+            self._index[key] = {"offset": offset, "length": len(audio), "last_used": time.time()}
+            self._save_index()
+
+    def _live_bytes(self) -> int:
+        return sum(e["length"] for e in self._index.values()) * _BYTES_PER_SAMPLE
+
+    def _evict_for(self, incoming: int):
+        evicted = 0
+        while self._index and self._live_bytes() + incoming > self.max_bytes:
+            lru = min(self._index, key=lambda k: self._index[k]["last_used"])
+            del self._index[lru]
+            evicted += 1
+        file_bytes = os.path.getsize(self._data_path) if os.path.exists(self._data_path) else 0
+        if evicted or file_bytes + incoming > self.max_bytes:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the arena with only live phrases, in offset order."""
+        arena = self._arena()
+        tmp_path = self._data_path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            cursor = 0
+            for key, entry in sorted(self._index.items(), key=lambda kv: kv[1]["offset"]):
+                chunk = np.array(arena[entry["offset"]:entry["offset"] + entry["length"]]) if arena is not None else None
+                if chunk is None or len(chunk) != entry["length"]:
+                    del self._index[key]
+                    continue
+                out.write(chunk.tobytes())
+                entry["offset"] = cursor
+                cursor += entry["length"]
+        arena = None
+        self._release_map()
+        os.replace(tmp_path, self._data_path)
+        self._save_index()
+
+    def flush(self):
+        """Persist last-used times (updated in memory on every hit)."""
+        with self._lock:
+            self._save_index()
+
+    def stats(self) -> dict:
+        return {
+            "phrases": len(self._index),
+            "bytes": self._live_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
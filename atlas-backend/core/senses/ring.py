@@ -0,0 +1,124 @@
+"""
+Audio Ring — preallocated single-producer / single-consumer sample buffer.
+
+The producer only ever advances ``_written`` and the consumer only ever
+advances ``_read``; both are plain ints whose assignment is atomic under the
+GIL, so neither side takes a lock on the data path.  Events are used only
+to park a side that has nothing to do (consumer on empty, producer on full).
+"""
+
+import threading
+import numpy as np
+
+
+class AudioRing:
+    def __init__(self, capacity: int, dtype=np.float32):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self._written = 0          # total samples ever written (producer-owned)
+        self._read = 0             # total samples ever read (consumer-owned)
+        self._data_ready = threading.Event()
+        self._space_ready = threading.Event()
+        self.dropped = 0           # samples discarded because the ring was full
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    def available(self) -> int:
+        return self._written - self._read
+
+    def free(self) -> int:
+        return self.capacity - (self._written - self._read)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """Mark end of stream; a blocked reader drains what is left, then gets None."""
+        self._closed = True
+        self._data_ready.set()
+        self._space_ready.set()
+
+    def clear(self):
+        """Consumer-side discard of everything buffered (e.g. on barge-in)."""
+        self._read = self._written
+        self._space_ready.set()
+
+    # ------------------------------------------------------------------
+    def write(self, samples, block: bool = True, timeout: float = None, stop_event=None) -> int:
+        """
+        Copy *samples* into the ring.  With ``block=False`` whatever does not
+        fit is dropped and counted in ``dropped``; with ``block=True`` the
+        producer waits for space (optionally aborting on *stop_event*).
+        Returns the number of samples written.
+        """
+        samples = np.asarray(samples, dtype=self._buf.dtype).reshape(-1)
+        total = 0
+        while total < len(samples):
+            space = self.free()
+            if space == 0:
+                if not block or self._closed:
+                    break
+                self._space_ready.clear()
+                if self.free() == 0:
+                    self._space_ready.wait(timeout if timeout is not None else 0.1)
+                if stop_event is not None and stop_event.is_set():
+                    break
+                continue
+            n = min(space, len(samples) - total)
+            self._copy_in(samples[total:total + n])
+            total += n
+        self.dropped += len(samples) - total
+        return total
+
+    def _copy_in(self, chunk: np.ndarray):
+        start = self._written % self.capacity
+        first = min(len(chunk), self.capacity - start)
+        self._buf[start:start + first] = chunk[:first]
+        if first < len(chunk):
+            self._buf[:len(chunk) - first] = chunk[first:]
+        self._written += len(chunk)
+        self._data_ready.set()
+
+    # ------------------------------------------------------------------
+    def read(self, max_samples: int, timeout: float = None, out: np.ndarray = None):
+        """
+        Return up to *max_samples* samples (at least one), waiting up to
+        *timeout* seconds for data.  Returns None on timeout or when the ring
+        is closed and empty.  Pass *out* to read into a caller-owned buffer.
+        """
+        if self.available() == 0:
+            if self._closed:
+                return None
+            self._data_ready.clear()
+            if self.available() == 0:
+                self._data_ready.wait(timeout)
+            if self.available() == 0:
+                return None
+        n = min(max_samples, self.available())
+        dest = out[:n] if out is not None else np.empty(n, dtype=self._buf.dtype)
+        self._copy_out(self._read, dest)
+        self._read += n
+        self._space_ready.set()
+        return dest
+
+    def read_exact(self, n: int, timeout: float = None, out: np.ndarray = None):
+        """Return exactly *n* samples, or None if they do not arrive in time."""
+        if self.available() < n:
+            self._data_ready.clear()
+            if self.available() < n and not self._closed:
+                self._data_ready.wait(timeout)
+            if self.available() < n:
+                return None
+        dest = out[:n] if out is not None else np.empty(n, dtype=self._buf.dtype)
+        self._copy_out(self._read, dest)
+        self._read += n
+        self._space_ready.set()
+        return dest
+
+    def _copy_out(self, position: int, dest: np.ndarray):
+        start = position % self.capacity
+        first = min(len(dest), self.capacity - start)
+        dest[:first] = self._buf[start:start + first]
+        if first < len(dest):
+            dest[first:] = self._buf[:len(dest) - first]
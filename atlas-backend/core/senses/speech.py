@@ -0,0 +1,193 @@
+"""
+Speech Pipeline — LLM token stream -> sentences -> audio -> speakers.
+
+Three stages run concurrently so ATLAS never goes quiet between sentences:
+
+  1. SentenceSegmenter  (caller thread)  turns streamed tokens into speakable
+     clauses as soon as a boundary is certain.
+  2. synthesis thread   renders clause N+1 with Kokoro while clause N plays.
+  3. playback thread    drains a bounded AudioRing into the output stream.
+
+Metrics: time-to-first-audio (from pipeline start) and every playback gap,
+i.e. time the speaker sat starved between sentences while more speech was
+still on its way.
+"""
+
+import queue
+import re
+import threading
+import time
+from colorama import Fore
+from core.senses.ring import AudioRing
+
+_ABBREVIATIONS = frozenset([
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g",
+    "i.e", "approx", "no", "vol", "fig", "inc", "ltd", "co", "mt", "dept",
+])
+_BOUNDARY = re.compile(r'[.!?\n]')
+_SOFT_BREAK = re.compile(r'[,;:—]\s|\s-\s')
+
+
+class SentenceSegmenter:
+    def __init__(self, max_clause_chars: int = 180, min_chars: int = 2):
+        self.max_clause_chars = max_clause_chars
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def push(self, text: str) -> list:
+        """Feed a streamed chunk; returns the clauses that are now complete."""
+        self._buffer += text
+        out = []
+        while True:
+            cut = self._find_boundary()
+            if cut is None:
+                cut = self._find_overflow_break()
+            if cut is None:
+                break
+            clause, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:]
+            if len(clause) >= self.min_chars:
+                out.append(clause)
+        return out
+
+    def flush(self) -> list:
+        clause, self._buffer = self._buffer.strip(), ""
+        return [clause] if len(clause) >= self.min_chars else []
+
+    def _find_boundary(self):
+        buf = self._buffer
+        for m in _BOUNDARY.finditer(buf):
+            i = m.start()
+            if buf[i] == "\n":
+                return i + 1
+            # Swallow runs like "?!" or "..." and closing quotes/brackets
+            end = i + 1
+            while end < len(buf) and buf[end] in '.!?"\')]':
+                end += 1
+            if end >= len(buf):
+                return None          # need one more character to be sure
+            if not buf[end].isspace():
+                continue             # "3.14", "file.py", "e.g" mid-token
+            if buf[i] == "." and end == i + 1 and self._is_abbreviation(buf[:i]):
+                continue
+            return end
+        return None
+
+    @staticmethod
+    def _is_abbreviation(before: str) -> bool:
+        word = before.rsplit(None, 1)[-1] if before.strip() else ""
+        word = word.lstrip('("\'').lower()
+        if not word:
+            return False
+        if len(word) == 1 and word.isalpha():
+            return True              # initials: "J. R. R."
+        return word in _ABBREVIATIONS
+
+    def _find_overflow_break(self):
+        if len(self._buffer) <= self.max_clause_chars:
+            return None
+        window = self._buffer[:self.max_clause_chars]
+        soft = [m.end() for m in _SOFT_BREAK.finditer(window)]
+        if soft:
+            return soft[-1]
+        space = window.rfind(" ")
+        return space + 1 if space > 0 else self.max_clause_chars
+
+
+class SpeechPipeline:
+    def __init__(self, mouth, stop_event=None, ring_seconds: float = 10.0):
+        self.mouth = mouth
+        self.stop_event = stop_event or threading.Event()
+        self.segmenter = SentenceSegmenter()
+        self.ring = AudioRing(int(mouth.sample_rate * ring_seconds))
+        self._sentences = queue.Queue()
+        self._synth_done = threading.Event()
+        self._started_at = time.perf_counter()
+        self.first_audio_ms = None
+        self.gaps_ms = []
+        self.sentence_count = 0
+        self._synth_thread = threading.Thread(target=self._synthesis_loop, daemon=True)
+        self._play_thread = threading.Thread(target=self._playback_loop, daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    # --- Stage 1: segmentation (caller thread) ----------------------------
+    def feed(self, text: str):
+        for clause in self.segmenter.push(text):
+            self._enqueue(clause)
+
+    def say(self, text: str):
+        """Queue a full utterance, bypassing the segmenter."""
+        self._enqueue(text)
+
+    def _enqueue(self, clause: str):
+        self.sentence_count += 1
+        self._sentences.put(clause)
+
+    def finish(self, wait: bool = True):
+        """Flush the trailing partial sentence and (optionally) wait for playback."""
+        if not self.stop_event.is_set():
+            for clause in self.segmenter.flush():
+                self._enqueue(clause)
+        self._sentences.put(None)
+        if wait:
+            self._synth_thread.join()
+            self._play_thread.join()
+
+    # --- Stage 2: synthesis ------------------------------------------------
+    def _synthesis_loop(self):
+        try:
+            while True:
+                sentence = self._sentences.get()
+                if sentence is None or self.stop_event.is_set():
+                    break
+                for audio in self.mouth.synthesize_iter(sentence):
+                    if self.stop_event.is_set():
+                        break
+                    self.ring.write(audio, block=True, stop_event=self.stop_event)
+        except Exception as e:
+            print(Fore.RED + f" [VOICE] Synthesis error: {e}")
+        finally:
+            self._synth_done.set()
+            self.ring.close()
+
+    # --- Stage 3: playback -------------------------------------------------
+    def _playback_loop(self):
+        chunk = int(self.mouth.sample_rate * 0.1)   # 100 ms writes keep barge-in responsive
+        starved_since = None
+        while True:
+            if self.stop_event.is_set():
+                self.ring.clear()
+                self.mouth.abort_playback()
+                return
+            audio = self.ring.read(chunk, timeout=0.05)
+            if audio is None:
+                if self.ring.closed and self.ring.available() == 0:
+                    return
+                if self.first_audio_ms is not None and starved_since is None:
+                    starved_since = time.perf_counter()
+                continue
+            now = time.perf_counter()
+            if self.first_audio_ms is None:
+                self.first_audio_ms = (now - self._started_at) * 1000
+            elif starved_since is not None:
+                self.gaps_ms.append((now - starved_since) * 1000)
+            starved_since = None
+            self.mouth.write_audio(audio)
+
+    # ------------------------------------------------------------------
+    def metrics(self) -> dict:
+        return {
+            "sentences": self.sentence_count,
+            "time_to_first_audio_ms": round(self.first_audio_ms, 1) if self.first_audio_ms is not None else None,
+            "gaps": len(self.gaps_ms),
+            "max_gap_ms": round(max(self.gaps_ms), 1) if self.gaps_ms else 0.0,
+            "total_gap_ms": round(sum(self.gaps_ms), 1),
+            "ring_dropped": self.ring.dropped,
+        }
+
+    def log_metrics(self):
+        m = self.metrics()
+        if m["time_to_first_audio_ms"] is None:
+            return
+        print(Fore.LIGHTBLACK_EX + f" [VOICE] first audio {m['time_to_first_audio_ms']}ms, "
+              f"{m['sentences']} sentences, {m['gaps']} gaps (max {m['max_gap_ms']}ms)")
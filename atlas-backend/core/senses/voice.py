@@ -8,16 +8,22 @@ import threading
 os.environ['KMP_DUPLICATE-LIB_OK'] = 'True'
 
 from kokoro import KPipeline
+from colorama import Fore
+from core.senses.phrase_cache import PhraseCache
+from config import VOICE_CACHE_PATH, VOICE_CACHE_MAX_MB
 
 class Mouth:
-    def __init__(self, device="cuda", blend_config=None):
+    def __init__(self, device="cuda", blend_config=None, speed=0.95):
         print(f"[VOICE] Loading Vocal Cords...")
 
         self.pipeline = KPipeline(lang_code='b', device=device)
         self.blend_config = blend_config or {'bm_george': 0.7, 'bm_fable': 0.3}
         self.sample_rate = 24000
+        self.speed = speed
         self.voice_tensor = self._mix_voices(self.blend_config)
         self.device = device
+        self._synth_lock = threading.Lock()
+        self.phrase_cache = PhraseCache(VOICE_CACHE_PATH, max_bytes=VOICE_CACHE_MAX_MB * 1024 * 1024) if VOICE_CACHE_PATH else None
 
         try:
             self.stream = sd.OutputStream(
@@ -43,40 +49,86 @@ class Mouth:
                 mixed_voice += weight * voice_tensor
         return mixed_voice
 
-    def speak(self, text, blend_config={'bm_george': 0.7, 'bm_fable': 0.3}, stop_event=None):
+    def synthesize_iter(self, text, cache=False):
+        """
+        Yield float32 audio for *text*, one Kokoro segment at a time.
+        Phrases already in the phrase cache play with zero model work; with
+        cache=True a fresh rendering is stored for next time.
+        """
+        if not text.strip(): return
+        key = PhraseCache.key(text, self.blend_config, self.speed) if self.phrase_cache else None
+        if key:
+            cached = self.phrase_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        rendered = []
+        segments = self.pipeline(text, voice=self.voice_tensor, speed=self.speed)
+        while True:
+            # Prewarm runs on a background thread; only one Kokoro forward pass at a time
+            with self._synth_lock:
+                segment = next(segments, None)
+            if segment is None:
+                break
+            gs, ps, audio = segment
+            audio_np = np.asarray(audio, dtype='float32')
+            if cache and key:
+                rendered.append(audio_np)
+            yield audio_np
+
+        # Only store complete renderings (a consumer that stopped early never gets here)
+        if rendered:
+            self.phrase_cache.put(key, np.concatenate(rendered))
+
+    def prewarm(self, phrases):
+        """Render any static phrases missing from the cache (call from a background thread)."""
+        if not self.phrase_cache: return
+        rendered = 0
+        for text in dict.fromkeys(p for p in phrases if p and p.strip()):
+            if PhraseCache.key(text, self.blend_config, self.speed) in self.phrase_cache:
+                continue
+            try:
+                for _ in self.synthesize_iter(text, cache=True):
+                    pass
+                rendered += 1
+            except Exception as e:
+                print(Fore.RED + f"[VOICE] Prewarm failed for '{text[:40]}': {e}")
+        if rendered:
+            print(Fore.LIGHTBLACK_EX + f"[VOICE] Phrase cache warmed: {rendered} new phrase(s).")
+
+    def write_audio(self, audio_chunk):
+        self.stream.write(audio_chunk)
+
+    def abort_playback(self):
+        # Clear any remaining audio in the hardware buffer
+        self.stream.abort()
+        self.stream.start()
+
+    def speak(self, text, blend_config={'bm_george': 0.7, 'bm_fable': 0.3}, stop_event=None, cache=False):
         if not text.strip(): return
-        
-        generator = self.pipeline(
-            text,
-            voice=self.voice_tensor,
-            speed=0.95,
-        )
 
         # 100ms chunks (Sample rate * 0.1 seconds)
         chunk_size = int(self.sample_rate * 0.1) 
 
-        for i, (gs, ps, audio) in enumerate(generator):
+        for audio_np in self.synthesize_iter(text, cache=cache):
             # Check if we were interrupted before processing the next sentence
             if stop_event and stop_event.is_set():
                 break
-                
-            # Ensure audio is a numpy array for slicing
-            audio_np = np.array(audio, dtype='float32')
             
             # Slice the audio into 100ms chunks and stream it
             for start in range(0, len(audio_np), chunk_size):
                 # Check for interruption mid-sentence
                 if stop_event and stop_event.is_set():
-                    # Clear any remaining audio in the hardware buffer (optional safeguard)
-                    self.stream.abort() 
-                    self.stream.start()
+                    self.abort_playback()
                     return # Exit the speak method entirely
 
                 end = min(start + chunk_size, len(audio_np))
-                audio_chunk = audio_np[start:end]
-                self.stream.write(audio_chunk)
+                self.write_audio(audio_np[start:end])
 
     def close(self):
+        if self.phrase_cache:
+            self.phrase_cache.flush()
         self.stream.stop()
         self.stream.close()
 
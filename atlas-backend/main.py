@@ -25,7 +25,8 @@ try:
     from core.brain.self.default_mode import DefaultModeNetwork
     from core.brain.self.user_model import UserModel
     from core.brain.cognition.task_queue import TaskQueue
-    from core.brain.cognition.executive import Executive
+    from core.brain.cognition.executive import Executive, linear_plan
+    from core.brain.cognition.store import store
     from core.senses.voice import Mouth
     from core.senses.hearing import Ear
     from core.brain.sensorimotor.motor import MotorCortex
@@ -151,7 +152,7 @@ def main():
                     habit_response = habits.check_trigger(user_input)
                     if habit_response:
                         print(Fore.GREEN + f" [ATLAS] (Habit): {habit_response}")
-                        if mouth: mouth.speak(habit_response, blend_config=VOICE_BLEND)
+                        if mouth: mouth.speak(habit_response, blend_config=VOICE_BLEND, cache=True)
                         continue
 
                     intent_future = pool.submit(router.route, user_input)
@@ -179,7 +180,7 @@ def main():
                     if intent == "COMMAND":
                         ack = random.choice(_ACKS)
                         print(Fore.GREEN + f" [ATLAS]: {ack}")
-                        if mouth: mouth.speak(ack, blend_config=VOICE_BLEND)
+                        if mouth: mouth.speak(ack, blend_config=VOICE_BLEND, cache=True)
 
                         synthesized = brain.synthesize_task(user_input)
                         print(Fore.MAGENTA + f" [ORCHESTRATOR] Task: '{synthesized[:100]}'")
@@ -187,10 +188,9 @@ def main():
                         if synthesized.startswith("[MULTI_STEP]"):
                             raw_steps = synthesized.replace("[MULTI_STEP]", "").strip()
                             steps = [s.strip() for s in raw_steps.split("|") if s.strip()]
-                            if len(steps) < 2:
-                                steps = executive.plan_execution(user_input)
-                            print(Fore.MAGENTA + f" [EXECUTIVE] {len(steps)}-step plan: {steps}")
-                            sys_result = worker.execute_plan(steps)
+                            plan = linear_plan(steps) if len(steps) >= 2 else executive.plan_graph(user_input)
+                            print(Fore.MAGENTA + f" [EXECUTIVE] {len(plan)}-step plan: {[(n['step'], n['after']) for n in plan]}")
+                            sys_result = worker.execute_plan(plan)
                         else:
                             sys_result = worker.execute_task(synthesized)
 
@@ -253,6 +253,7 @@ def main():
     stats = sleep_system.sleep(brain.get_conversation_history(), brain.get_session_start(), consolidate=True)
     if stats.get("consolidation") and stats["consolidation"].get("consolidated", 0) > 0:
         print(Fore.MAGENTA + f" [CONSOLIDATOR] Merged {stats['consolidation']['consolidated']} facts.")
+    store.close()
 
     if mouth:
         try: mouth.close()
@@ -0,0 +1,250 @@
+"""
+Memory benchmark — how the long-term memory stack scales with corpus size.
+
+Builds synthetic fact and episode corpora in a temporary database, then times
+save_memory, recall (vector and hybrid), forget, recall_episodes and one full
+consolidation run.  Embeddings come from a deterministic hashing stub by
+default (no model download, no GPU) and Ollama is stubbed, so the numbers
+measure the store and our code, not the encoder or the LLM.  Each size runs
+in its own Python process, so its peak_rss_mb is that size's own high-water
+mark rather than the largest run so far.
+
+Run from atlas-backend/:
+
+    python scripts/bench_memory.py --sizes 1000,10000 --out bench.json
+    python scripts/bench_memory.py --sizes 1000 --embedder real
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import ollama
+import psutil
+
+from core.brain.cognition.embedder import embedder
+from core.brain.cognition.store import store
+
+_SUBJECTS = ["User", "Tudor", "The ATLAS project", "The sandbox", "The worker node", "The frontend"]
+_VERBS = ["prefers", "uses", "is building", "wants", "dislikes", "is learning", "deployed", "fixed"]
+_OBJECTS = [
+    "Python for scripting", "C++ for the engine", "an RTX 5050 GPU", "Ollama with llama3.1",
+    "React for the dashboard", "Docker containers", "a Kokoro voice", "ChromaDB for memory",
+    "a faster-whisper ear", "Windows 11", "dark mode", "short answers", "a mechanical keyboard",
+]
+_WORD = re.compile(r"\w+")
+
+
+class HashEmbedder:
+    """Deterministic bag-of-words hashing encoder: similar texts get similar vectors."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+                out[row, h % self.dim] += 1.0 if h >> 63 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+def _stub_generate(model=None, prompt="", **kwargs):
+    facts = [line[2:] for line in prompt.splitlines() if line.startswith("- ")]
+    return {"response": " and ".join(facts)[:300] if facts else "Stub summary of the session."}
+
+
+def make_facts(n: int, rng: random.Random) -> list:
+    return [
+        f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} (note {i})"
+        for i in range(n)
+    ]
+
+
+def make_episodes(n: int, rng: random.Random) -> list:
+    start = datetime.now() - timedelta(days=n)
+    episodes = []
+    for i in range(n):
+        day = start + timedelta(days=i)
+        topics = ", ".join(rng.sample(_OBJECTS, 3))
+        episodes.append((f"[{day:%Y-%m-%d %H:%M}] - Discussed {topics}.\n- Session {i}.", day))
+    return episodes
+
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+def timed(fn, args_list: list) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - start
+    return {
+        "ops": len(args_list),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "max_ms": round(max(latencies), 3) if latencies else 0.0,
+        "throughput_ops_s": round(len(args_list) / total, 1) if total else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    info = psutil.Process().memory_info()
+    peak = getattr(info, "peak_wset", None)            # Windows
+    if peak is None:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak *= 1 if sys.platform == "darwin" else 1024   # Linux reports KiB
+        except ImportError:
+            peak = info.rss
+    return round(peak / (1024 * 1024), 1)
+
+
+def bulk_load(collection, texts: list, metadatas: list, chunk: int = 1000) -> dict:
+    start = time.perf_counter()
+    for i in range(0, len(texts), chunk):
+        part = texts[i:i + chunk]
+        collection.add(
+            ids=[f"bench-{collection.name}-{i + j}" for j in range(len(part))],
+            documents=part,
+            embeddings=embedder.encode(part).tolist(),
+            metadatas=metadatas[i:i + chunk],
+        )
+    seconds = time.perf_counter() - start
+    return {"docs": len(texts), "seconds": round(seconds, 2), "docs_per_s": round(len(texts) / seconds, 1) if seconds else 0.0}
+
+
+def run_size(size: int, queries: int, seed: int) -> dict:
+    from core.brain.cognition.memory import MemorySystem
+    from core.brain.limbic.archivist import Archivist
+    from core.brain.limbic.consolidator import Consolidator
+
+    rng = random.Random(seed)
+    db_path = tempfile.mkdtemp(prefix=f"atlas_bench_{size}_")
+    try:
+        mem = MemorySystem(db_path=db_path)
+        archivist = Archivist(db_path=db_path)
+        consolidator = Consolidator(db_path=db_path, state_path=os.path.join(db_path, "consolidation.json"))
+
+        facts = make_facts(size, rng)
+        now = datetime.now()
+        fact_meta = [{
+            "timestamp": (now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))).isoformat(),
+            "importance": float(rng.randint(1, 10)),
+            "tags": "bench",
+            "confirmed": True,
+        } for _ in facts]
+        episodes = make_episodes(max(10, size // 10), rng)
+        result = {
+            "size": size,
+            "ingest_facts": bulk_load(mem.collection, facts, fact_meta),
+            "ingest_episodes": bulk_load(
+                archivist.episodes, [e for e, _ in episodes],
+                [{"date": d.strftime("%Y-%m-%d"), "timestamp": d.strftime("%Y-%m-%d %H:%M"), "type": "session"} for _, d in episodes]
+            ),
+        }
+
+        probes = [f"What does {rng.choice(_SUBJECTS)} use for {rng.choice(_OBJECTS).split()[-1]}?" for _ in range(queries)]
+        result["recall_vector"] = timed(lambda q: mem.recall(q, n_results=3, similarity_threshold=0.9), [(q,) for q in probes])
+        result["recall_hybrid"] = timed(lambda q: mem.recall(q, n_results=3, similarity_threshold=0.9, mode="hybrid"), [(q,) for q in probes])
+        result["recall_episodes"] = timed(lambda q: archivist.recall_episodes(q, n=3, threshold=0.9), [(q,) for q in probes])
+
+        # Half brand-new facts, half repeats of stored ones (the common case in practice)
+        saves = make_facts(queries // 2, random.Random(seed + 1))
+        saves = [f.replace("(note", "(new note") for f in saves] + rng.sample(facts, queries - len(saves))
+        rng.shuffle(saves)
+        result["save_memory"] = timed(lambda t: mem.save_memory(t, importance=5.0, tags=["bench"]), [(t,) for t in saves])
+
+        result["forget"] = timed(lambda t: mem.forget(t, threshold=0.5), [(t,) for t in rng.sample(facts, min(queries, len(facts)) // 4 or 1)])
+
+        start = time.perf_counter()
+        stats = consolidator.consolidate(min_cluster_size=2, threshold=0.15)
+        result["consolidate"] = dict(stats, wall_seconds=round(time.perf_counter() - start, 2))
+        start = time.perf_counter()
+        again = consolidator.consolidate(min_cluster_size=2, threshold=0.15)
+        result["consolidate_rerun"] = {"wall_seconds": round(time.perf_counter() - start, 3), "llm_calls": again.get("llm_calls", 0)}
+
+        result["peak_rss_mb"] = peak_rss_mb()
+        return result
+    finally:
+        store.close()
+        shutil.rmtree(db_path, ignore_errors=True)
+
+
+def run_isolated(size: int, args) -> dict:
+    """run_size in a fresh interpreter, so RSS and caches start from zero for every size."""
+    fd, out = tempfile.mkstemp(prefix=f"atlas_bench_{size}_", suffix=".json")
+    os.close(fd)
+    try:
+        subprocess.run([
+            sys.executable, os.path.abspath(__file__), "--single", str(size), "--queries", str(args.queries),
+            "--embedder", args.embedder, "--seed", str(args.seed), "--out", out,
+        ], check=True)
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ATLAS long-term memory stack.")
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated corpus sizes (facts)")
+    parser.add_argument("--queries", type=int, default=200, help="operations per timed phase")
+    parser.add_argument("--embedder", choices=["stub", "real"], default="stub")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)   # child process: one size, JSON to --out
+    args = parser.parse_args()
+
+    if args.single is not None:
+        if args.embedder == "stub":
+            embedder.use_model(HashEmbedder(), name="bench-hash-384")
+        ollama.generate = _stub_generate
+        run = run_size(args.single, args.queries, args.seed)
+        run["embedder_stats"] = embedder.stats()
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(run, f)
+        return
+
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "embedder": "bench-hash-384" if args.embedder == "stub" else "real",
+        "queries": args.queries,
+        "runs": [run_isolated(int(s), args) for s in args.sizes.split(",") if s.strip()],
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Report written to {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,41 +20,65 @@ function timeAgo(timestamp) {
   return `${Math.floor(diff / 604800)}w ago`;
 }
 
+const PAGE_SIZE = 50;
+
 export default memo(function MemoryApp({ onBack }) {
   const [memories, setMemories] = useState([]);
-  const [total, setTotal]       = useState(0);
+  const [total, setTotal]       = useState(null);   // null for search: only the loaded count is known
   const [query, setQuery]       = useState('');
   const [loading, setLoading]   = useState(true);
+  const [hasMore, setHasMore]   = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const debounceRef             = useRef(null);
 
-  const loadAll = useCallback(() => {
+  // One page of /memory/list or /memory/search; offset = entries already shown,
+  // so deleting an entry never makes the next page skip one.
+  const fetchPage = useCallback((q, offset) => {
+    const url = q.trim()
+      ? `${API}/memory/search?q=${encodeURIComponent(q)}&limit=${PAGE_SIZE}&offset=${offset}`
+      : `${API}/memory/list?limit=${PAGE_SIZE}&offset=${offset}`;
+    return fetch(url).then(r => r.json());
+  }, []);
+
+  const loadFirst = useCallback((q) => {
     setLoading(true);
-    fetch(`${API}/memory/list`)
-      .then(r => r.json())
-      .then(d => { setMemories(d.memories); setTotal(d.total); })
+    fetchPage(q, 0)
+      .then(d => {
+        setMemories(d.memories);
+        setTotal(d.total ?? null);
+        setHasMore(d.next_offset != null);
+      })
       .catch(() => {})
       .finally(() => setLoading(false));
-  }, []);
+  }, [fetchPage]);
+
+  const loadMore = () => {
+    if (loadingMore) return;
+    setLoadingMore(true);
+    fetchPage(query, memories.length)
+      .then(d => {
+        setMemories(prev => {
+          const seen = new Set(prev.map(m => m.id));
+          return prev.concat(d.memories.filter(m => !seen.has(m.id)));
+        });
+        if (d.total != null) setTotal(d.total);
+        setHasMore(d.next_offset != null);
+      })
+      .catch(() => {})
+      .finally(() => setLoadingMore(false));
+  };
 
-  useEffect(() => { loadAll(); }, [loadAll]);
+  useEffect(() => { loadFirst(''); }, [loadFirst]);
 
   const handleSearch = (q) => {
     setQuery(q);
     if (debounceRef.current) clearTimeout(debounceRef.current);
-    debounceRef.current = setTimeout(() => {
-      if (!q.trim()) { loadAll(); return; }
-      setLoading(true);
-      fetch(`${API}/memory/search?q=${encodeURIComponent(q)}`)
-        .then(r => r.json())
-        .then(d => { setMemories(d.memories); setTotal(d.total); })
-        .catch(() => {})
-        .finally(() => setLoading(false));
-    }, 400);
+    debounceRef.current = setTimeout(() => loadFirst(q), 400);
   };
 
   const handleDelete = (id) => {
     setMemories(prev => prev.filter(m => m.id !== id));
-    setTotal(prev => Math.max(0, prev - 1));
+    setTotal(prev => (prev == null ? prev : Math.max(0, prev - 1)));
     fetch(`${API}/memory/${encodeURIComponent(id)}`, { method: 'DELETE' }).catch(() => {});
   };
 
@@ -86,7 +110,7 @@ export default memo(function MemoryApp({ onBack }) {
         </div>
 
         <div className="ml-auto text-[9px] tracking-[0.2em] text-stark-cyan/30 font-mono border border-stark-cyan/10 px-2 py-1 rounded">
-          {memories.length} ENTRIES
+          {total != null ? `${memories.length} / ${total}` : memories.length} ENTRIES
         </div>
       </div>
 
@@ -165,6 +189,17 @@ export default memo(function MemoryApp({ onBack }) {
                   )}
                 </div>
               ))}
+              {hasMore && (
+                <button
+                  data-hand-target
+                  data-hand-label="LOAD MORE"
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="mt-3 self-center text-[9px] tracking-[0.2em] text-stark-cyan/60 hover:text-stark-cyan border border-stark-cyan/20 hover:border-stark-cyan/50 px-3 py-1 rounded transition-colors disabled:opacity-40"
+                >
+                  {loadingMore ? 'LOADING...' : 'LOAD MORE'}
+                </button>
+              )}
             </div>
           )}
         </div>